@@ -0,0 +1,96 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Per-page cost of the old temporary-PNG round trip versus handing the
+# rendered page to Tesseract directly.
+#
+# The hand-off comparison runs anywhere; the full OCR comparison is added
+# when tesseract is installed.
+#
+#   python benchmarks/ocr_in_memory.py --pages 10
+import argparse
+import shutil
+import tempfile
+import time
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+from src.config import Config
+from src.services.ocr_service import OCRService
+
+def make_page():
+    """
+    A 300 dpi letter page with report-like text, as pdf2image would render it
+    """
+    font = ImageFont.load_default(size=36)
+    image = Image.new('RGB', (2550, 3300), 'white')
+    draw = ImageDraw.Draw(image)
+    for line in range(40):
+        draw.text(
+            (150, 150 + line * 75),
+            f"Hemoglobin {12 + line % 5}.{line % 10} g/dL  Reference range 13.0 - 17.0",
+            fill='black',
+            font=font
+        )
+    return image
+
+def png_round_trip(image):
+    """
+    What _extract_text_from_pdf used to do before OCR: PNG to a temp file,
+    reopen, convert to RGB, then let pytesseract write it out again as PNG
+    """
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+        image.save(temp_file.name, 'PNG')
+        reopened = Image.open(temp_file.name).convert('RGB')
+        reopened.save(temp_file.name + '_input.PNG', 'PNG')
+        os.unlink(temp_file.name + '_input.PNG')
+        os.unlink(temp_file.name)
+
+def direct_hand_off(image):
+    """
+    What extract_text_from_image does now: one uncompressed PPM dump
+    """
+    with tempfile.NamedTemporaryFile(suffix='.ppm', delete=False) as temp_file:
+        image.save(temp_file.name, 'PPM')
+        os.unlink(temp_file.name)
+
+def time_per_page(func, pages, image):
+    started = time.perf_counter()
+    for _ in range(pages):
+        func(image)
+    return (time.perf_counter() - started) / pages * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark in-memory page OCR')
+    parser.add_argument('--pages', type=int, default=10)
+    args = parser.parse_args()
+
+    image = make_page()
+
+    old_ms = time_per_page(png_round_trip, args.pages, image)
+    new_ms = time_per_page(direct_hand_off, args.pages, image)
+    print(f"image hand-off per page: PNG round trip {old_ms:.1f} ms, direct {new_ms:.1f} ms, "
+          f"saved {old_ms - new_ms:.1f} ms")
+
+    tesseract = Config.TESSERACT_CMD if os.path.exists(Config.TESSERACT_CMD) else shutil.which('tesseract')
+    if not tesseract:
+        print("tesseract not found, skipping the full OCR comparison")
+        return
+
+    service = OCRService()
+
+    def old_ocr(page):
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+            page.save(temp_file.name, 'PNG')
+            reopened = Image.open(temp_file.name).convert('RGB')
+            pytesseract.image_to_string(reopened, lang='eng')
+            os.unlink(temp_file.name)
+
+    old_ms = time_per_page(old_ocr, args.pages, image)
+    new_ms = time_per_page(service.extract_text_from_image, args.pages, image.copy())
+    print(f"full OCR per page: PNG round trip {old_ms:.1f} ms, direct {new_ms:.1f} ms, "
+          f"saved {old_ms - new_ms:.1f} ms")
+
+if __name__ == '__main__':
+    main()
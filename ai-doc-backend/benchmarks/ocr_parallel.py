@@ -0,0 +1,82 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Measures how PDF OCR throughput (pages/sec) scales with the number of
+# OCR worker processes. Requires tesseract and poppler to be installed.
+#
+#   python benchmarks/ocr_parallel.py --pages 20
+#   python benchmarks/ocr_parallel.py --pdf path/to/report.pdf
+import argparse
+import tempfile
+import time
+from PIL import Image, ImageDraw, ImageFont
+from src.config import Config
+from src.services import ocr_service
+from src.services.ocr_service import OCRService
+
+def make_sample_pdf(path, pages):
+    """
+    Write a multi-page, image-only PDF that looks like a lab report
+    """
+    font = ImageFont.load_default(size=36)
+    images = []
+    for page in range(pages):
+        image = Image.new('RGB', (2550, 3300), 'white')
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            draw.text(
+                (150, 150 + line * 75),
+                f"Page {page + 1} Hemoglobin {12 + line % 5}.{line % 10} g/dL  Reference range 13.0 - 17.0",
+                fill='black',
+                font=font
+            )
+        images.append(image)
+    images[0].save(path, 'PDF', resolution=300, save_all=True, append_images=images[1:])
+
+def worker_counts():
+    counts = []
+    count = 1
+    while count < (os.cpu_count() or 1):
+        counts.append(count)
+        count *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel per-page PDF OCR')
+    parser.add_argument('--pdf', help='PDF to OCR (a synthetic one is generated by default)')
+    parser.add_argument('--pages', type=int, default=12, help='pages in the synthetic PDF')
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(), 'sample.pdf')
+        make_sample_pdf(pdf_path, args.pages)
+
+    service = OCRService()
+    baseline = None
+
+    print(f"{'workers':>8} {'seconds':>10} {'pages/sec':>10} {'speedup':>8}")
+    for workers in worker_counts():
+        ocr_service.shutdown_process_pool()
+        Config.OCR_WORKERS = workers
+        Config.OCR_PARALLEL_PAGES = workers > 1
+
+        # Warm up the pool so process start-up is not part of the timing
+        if workers > 1:
+            ocr_service._get_process_pool().submit(int).result()
+
+        started = time.perf_counter()
+        text = service.extract_text_from_file(pdf_path, 'pdf')
+        elapsed = time.perf_counter() - started
+
+        pages = text.count('--- Page ')
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {pages / elapsed:>10.2f} {baseline / elapsed:>7.2f}x")
+
+    ocr_service.shutdown_process_pool()
+
+if __name__ == '__main__':
+    main()
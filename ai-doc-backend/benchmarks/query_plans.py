@@ -0,0 +1,168 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Checks that the hot report and chat queries are served by the composite
+# indexes, on a fresh database and on a copy of the committed database,
+# created with db.create_all() before migrations existed. Exits non-zero if
+# any query scans its table or sorts in a temporary B-tree, or the upgrade
+# doesn't backfill report content hashes.
+#
+#   python benchmarks/query_plans.py
+import argparse
+import json
+import shutil
+import tempfile
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import case, func, select, text
+from src.models.user import db
+from src.models.report import Report, ChatMessage
+from src.models.job import Job
+from src.migrations import run_migrations
+from src.utils.pagination import encode_cursor, keyset_query
+
+# A cursor deep into the history, as a client scrolling back would send
+DEEP_CURSOR = encode_cursor(datetime(2020, 1, 1), 1000)
+
+# Committed database, still in the schema db.create_all() gave before migrations
+LEGACY_DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'database', 'app.db')
+LEGACY_CONTENT_HASH = 'a' * 64
+
+# (description, query, index expected in the plan)
+HOT_QUERIES = [
+    (
+        'report list',
+        lambda: Report.query.filter_by(user_id=1).order_by(Report.created_at.desc()),
+        'ix_reports_user_created'
+    ),
+    (
+        'processed report count',
+        lambda: Report.query.filter_by(user_id=1, status='processed'),
+        'ix_reports_user_created'
+    ),
+    (
+        'recent chat history of a report',
+        lambda: ChatMessage.query.filter_by(report_id=1, user_id=1)
+                                 .order_by(ChatMessage.timestamp.desc()).limit(10),
+        'ix_chat_messages_report_user_timestamp'
+    ),
+    (
+        'all chat history of a user',
+        lambda: ChatMessage.query.filter_by(user_id=1).order_by(ChatMessage.timestamp.desc()),
+        'ix_chat_messages_user_timestamp'
+    ),
+    (
+        'user stats',
+        lambda: db.session.query(
+            func.count(Report.id),
+            func.count(case((Report.status == 'processed', 1))),
+            func.count(case((Report.created_at >= datetime(2024, 1, 1), 1))),
+            select(func.count(ChatMessage.id)).where(ChatMessage.user_id == 1).scalar_subquery()
+        ).filter(Report.user_id == 1),
+        'ix_reports_user_created'
+    ),
+    (
+        'report list page',
+        lambda: keyset_query(Report.query.filter_by(user_id=1), Report.created_at, Report.id, 20, DEEP_CURSOR),
+        'ix_reports_user_created'
+    ),
+    (
+        'chat history page of a report',
+        lambda: keyset_query(ChatMessage.query.filter_by(report_id=1, user_id=1),
+                             ChatMessage.timestamp, ChatMessage.id, 20, DEEP_CURSOR),
+        'ix_chat_messages_report_user_timestamp'
+    ),
+    (
+        'chat history page of a user',
+        lambda: keyset_query(ChatMessage.query.filter_by(user_id=1),
+                             ChatMessage.timestamp, ChatMessage.id, 20, DEEP_CURSOR),
+        'ix_chat_messages_user_timestamp'
+    ),
+    (
+        'reports sharing an upload',
+        lambda: Report.query.filter_by(content_hash=LEGACY_CONTENT_HASH),
+        'ix_reports_content_hash'
+    ),
+]
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def upgrade_legacy_database():
+    """
+    Migrate the copied legacy database, queueing a processing job (as the
+    upload route did before reports had a content hash) between migrations
+    2 and 3; returns 1 if migration 3 didn't backfill the hash, else 0
+    """
+    run_migrations(target=2)
+
+    report_id = db.session.execute(text('SELECT MIN(id) FROM reports')).scalar()
+    db.session.add(Job(
+        kind='process_report',
+        report_id=report_id,
+        payload=json.dumps({'target_language': 'hi', 'content_hash': LEGACY_CONTENT_HASH}),
+        status='completed'
+    ))
+    db.session.commit()
+
+    run_migrations()
+
+    backfilled = db.session.execute(
+        text('SELECT content_hash FROM reports WHERE id = :report_id'), {'report_id': report_id}
+    ).scalar() == LEGACY_CONTENT_HASH
+    print(f"[{'ok' if backfilled else 'FAIL'}] upgraded database: content hash backfilled from the job payload")
+    return int(not backfilled)
+
+def query_plan(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as connection:
+        rows = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+    return [row[-1] for row in rows]
+
+def check(label, legacy):
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, 'check.db')
+        if legacy:
+            shutil.copy(LEGACY_DATABASE, database_path)
+
+        app = create_app(database_path)
+        with app.app_context():
+            if legacy:
+                failures += upgrade_legacy_database()
+            else:
+                run_migrations()
+
+            for description, build_query, index in HOT_QUERIES:
+                plan = query_plan(build_query())
+                ok = (
+                    any(index in step for step in plan)
+                    and not any(step.startswith('SCAN') and 'INDEX' not in step for step in plan)
+                    and not any('TEMP B-TREE' in step for step in plan)
+                )
+                failures += not ok
+                print(f"[{'ok' if ok else 'FAIL'}] {label}: {description}")
+                for step in plan:
+                    print(f"        {step}")
+
+            db.engine.dispose()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that hot queries use their indexes')
+    parser.parse_args()
+
+    failures = check('fresh database', legacy=False) + check('upgraded database', legacy=True)
+    if failures:
+        print(f"{failures} queries are not using their index")
+        sys.exit(1)
+    print("All hot queries use their indexes")
+
+if __name__ == '__main__':
+    main()
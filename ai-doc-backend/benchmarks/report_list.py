@@ -0,0 +1,110 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Bytes and time per GET /api/reports for the full list versus
+# ?fields=summary, on a temporary database of processed reports with
+# realistically sized content.
+#
+#   python benchmarks/report_list.py --reports 50 --requests 20
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+import jwt
+from flask import Flask
+from src.config import Config
+from src.models.user import db, User
+from src.models.report import Report
+from src.migrations import run_migrations
+from src.routes.reports import reports_bp
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    return app
+
+def seed(reports, content_chars):
+    """
+    One user with `reports` processed reports; returns the user's token
+    """
+    user = User(email='benchmark@example.com', password_hash='x', first_name='Bench', last_name='Mark')
+    db.session.add(user)
+    db.session.commit()
+
+    line = "Hemoglobin 12.4 g/dL  Reference range 13.0 - 17.0  Low\n"
+    content = (line * (content_chars // len(line) + 1))[:content_chars]
+    findings = json.dumps([
+        {'name': f'Finding {i}', 'value': '12.4 g/dL', 'status': 'low'} for i in range(8)
+    ])
+    started = datetime(2024, 1, 1)
+    for i in range(reports):
+        db.session.add(Report(
+            user_id=user.id,
+            title=f'Blood test {i}',
+            file_type='pdf',
+            file_path=f'uploads/report_{i}.pdf',
+            original_content=content,
+            translated_content=content,
+            translated_language='hi',
+            explanation=content[:content_chars // 2],
+            health_tips=content[:content_chars // 4],
+            key_findings=findings,
+            status='processed',
+            created_at=started + timedelta(hours=i)
+        ))
+    db.session.commit()
+
+    return jwt.encode(
+        {'user_id': user.id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+        Config.JWT_SECRET_KEY,
+        algorithm='HS256'
+    )
+
+def measure(client, url, headers, requests):
+    """
+    (response bytes, median ms) of `requests` GETs of `url`
+    """
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+    return len(response.data), statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the summary report list')
+    parser.add_argument('--reports', type=int, default=50)
+    parser.add_argument('--content-chars', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, 'benchmark.db'))
+        with app.app_context():
+            run_migrations()
+            token = seed(args.reports, args.content_chars)
+
+            client = app.test_client()
+            headers = {'Authorization': f'Bearer {token}'}
+            full_bytes, full_ms = measure(client, '/api/reports/', headers, args.requests)
+            summary_bytes, summary_ms = measure(client, '/api/reports/?fields=summary', headers, args.requests)
+
+            db.engine.dispose()
+
+    print(f"{args.reports} reports of {args.content_chars} characters, median of {args.requests} requests")
+    print(f"full list:    {full_bytes:>10,} bytes {full_ms:8.1f} ms")
+    print(f"summary list: {summary_bytes:>10,} bytes {summary_ms:8.1f} ms")
+    print(f"saved per request: {full_bytes - summary_bytes:,} bytes "
+          f"({(1 - summary_bytes / full_bytes) * 100:.1f}%), {full_ms - summary_ms:.1f} ms")
+
+if __name__ == '__main__':
+    main()
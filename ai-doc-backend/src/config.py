@@ -18,8 +18,37 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours
     
+    # Authentication caches, per process (0 entries disables a cache)
+    AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))  # seconds a user is served without reading the database
+    AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_USER_CACHE_MAX_ENTRIES', 1000))
+    AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000))  # verified tokens, kept until they expire
+    
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    AI_CALL_TIMEOUT = float(os.getenv('AI_CALL_TIMEOUT', 90))  # seconds per LLM call
+    AI_QUEUE_TIMEOUT = float(os.getenv('AI_QUEUE_TIMEOUT', 300))  # seconds an analysis call may wait for a free slot
+    AI_CONCURRENT_ANALYSIS = os.getenv('AI_CONCURRENT_ANALYSIS', 'true').lower() == 'true'
+    AI_COMBINED_ANALYSIS = os.getenv('AI_COMBINED_ANALYSIS', 'false').lower() == 'true'  # one JSON call instead of three
+    AI_STREAM_EXPLANATION = os.getenv('AI_STREAM_EXPLANATION', 'true').lower() == 'true'  # save partial explanations while processing uploads
+    AI_MAX_CONCURRENT_CALLS = int(os.getenv('AI_MAX_CONCURRENT_CALLS', 12))  # shared across requests
+    
+    # Prompt token budgets per model, e.g. "gpt-4=6000,gpt-4o=30000"
+    AI_PROMPT_TOKEN_BUDGETS = {
+        model.strip(): int(budget)
+        for model, budget in (
+            item.split('=') for item in os.getenv('AI_PROMPT_TOKEN_BUDGETS', 'gpt-4=6000').split(',') if item
+        )
+    }
+    AI_DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv('AI_DEFAULT_PROMPT_TOKEN_BUDGET', 6000))
+    
+    # Report passage retrieval for chat
+    REPORT_PASSAGE_CHARS = int(os.getenv('REPORT_PASSAGE_CHARS', 800))  # approximate passage size when indexing
+    CHAT_RETRIEVAL_TOP_K = int(os.getenv('CHAT_RETRIEVAL_TOP_K', 5))  # passages sent per chat turn (0 = whole report)
+    
+    # LLM Response Cache Configuration (chat is never cached)
+    LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')  # memory, sqlite or none
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 86400))  # seconds
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1000))
     
     # Translation API Configuration
     GOOGLE_TRANSLATE_API_KEY = os.getenv('GOOGLE_TRANSLATE_API_KEY')
@@ -28,17 +57,72 @@ class Config:
     AZURE_TRANSLATOR_REGION = os.getenv('AZURE_TRANSLATOR_REGION')
     DEEPL_API_KEY = os.getenv('DEEPL_API_KEY')
     
+    TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', 30))  # seconds per provider call
+    TRANSLATION_MAX_CONCURRENCY = int(os.getenv('TRANSLATION_MAX_CONCURRENCY', 4))  # chunks translated at once
+    TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'true').lower() == 'true'  # reuse translated segments
+    TRANSLATION_CALL_DEADLINE = float(os.getenv('TRANSLATION_CALL_DEADLINE', 20))  # hard limit per provider call, seconds
+    TRANSLATION_HEDGE_DELAY = float(os.getenv('TRANSLATION_HEDGE_DELAY', 0))  # start the next provider after this many seconds (0 = off)
+    TRANSLATION_SLOW_LATENCY = float(os.getenv('TRANSLATION_SLOW_LATENCY', 5))  # median latency that demotes a provider, seconds
+    
+    # Provider Circuit Breakers
+    CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', 20))  # recent calls tracked per provider
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', 5))  # calls needed before the circuit can open
+    CIRCUIT_ERROR_THRESHOLD = float(os.getenv('CIRCUIT_ERROR_THRESHOLD', 0.5))  # error rate that opens the circuit
+    CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', 30))  # seconds before a trial call is let through
+    
+    # Outbound HTTP Connection Pools (one shared pool per upstream)
+    HTTP_POOL_MAX_CONNECTIONS = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS', 20))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.getenv('HTTP_POOL_MAX_KEEPALIVE', 10))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 60))  # seconds an idle connection is kept
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+    HTTP_PROXY = os.getenv('UPSTREAM_PROXY', os.getenv('HTTPS_PROXY', os.getenv('https_proxy')))  # proxy for upstream API calls (all HTTPS)
+    
     # File Upload Configuration
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 10485760))  # 10MB default
     BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(BASE_DIR, 'uploads'))
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'txt'}
     
+    # Keyset pagination of report lists and chat history (?limit=&cursor=)
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 20))
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 100))
+    
+    # Background Job Queue Configuration
+    JOB_QUEUE_ENABLED = os.getenv('JOB_QUEUE_ENABLED', 'true').lower() == 'true'
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # worker threads per process
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2.0))  # seconds
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 900))  # reclaim jobs whose worker went silent
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    
+    # Shared SQLite LLM cache file (LLM_CACHE_BACKEND=sqlite)
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(BASE_DIR, 'cache', 'llm_cache.db'))
+    
+    # Persistent segment-level translation memory
+    TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', os.path.join(BASE_DIR, 'cache', 'translation_memory.db'))
+    TRANSLATION_MEMORY_TTL = int(os.getenv('TRANSLATION_MEMORY_TTL', 2592000))  # seconds an entry is kept (30 days default)
+    TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', 100000))
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
     
     # OCR Configuration
     TESSERACT_CMD = os.getenv('TESSERACT_CMD', '/usr/bin/tesseract')
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'pytesseract')  # pytesseract, or tesserocr for warm engines (pip install tesserocr)
+    OCR_LANGUAGE = os.getenv('OCR_LANGUAGE', 'eng')
+    TESSDATA_PATH = os.getenv('TESSDATA_PATH')  # tessdata directory for tesserocr, defaults to its built-in path
+    PDF_TEXT_LAYER_ENABLED = os.getenv('PDF_TEXT_LAYER_ENABLED', 'true').lower() == 'true'  # use embedded PDF text before OCR
+    PDF_TEXT_MIN_CHARS = int(os.getenv('PDF_TEXT_MIN_CHARS', 20))  # alphanumeric chars for a page to skip OCR
+    PDF_SCAN_MIN_COVERAGE = float(os.getenv('PDF_SCAN_MIN_COVERAGE', 0.5))  # share of a page covered by images for it to count as scanned
+    PDF_SCANNED_TEXT_MIN_CHARS = int(os.getenv('PDF_SCANNED_TEXT_MIN_CHARS', 200))  # text a scanned page needs (searchable scans) to skip OCR
+    OCR_DPI = int(os.getenv('OCR_DPI', 300))
+    OCR_PAGE_WINDOW = int(os.getenv('OCR_PAGE_WINDOW', 2))  # pages rendered at a time
+    OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', 100))  # per document
+    OCR_MAX_PIXELS = int(os.getenv('OCR_MAX_PIXELS', 1500000000))  # rendered pixels per document
+    OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+    OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'ocr'))
+    OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', 104857600))  # 100MB default
+    OCR_PARALLEL_PAGES = os.getenv('OCR_PARALLEL_PAGES', 'true').lower() == 'true'
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))  # processes for per-page OCR
     
     # Supported Languages
     SUPPORTED_LANGUAGES = {
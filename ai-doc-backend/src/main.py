@@ -7,12 +7,16 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.models.report import Report, ChatMessage
+from src.models.job import Job
+from src.models.report_index import ReportPassage, ReportPassageTerm
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.reports import reports_bp
 from src.routes.ai import ai_bp
 from src.routes.chat import chat_bp
 from src.config import Config
+from src.migrations import run_migrations
+from src.services.job_queue import job_queue
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -34,9 +38,6 @@ app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirnam
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
-with app.app_context():
-    db.create_all()
-
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -62,4 +63,15 @@ def internal_error(error):
     return {"error": "Internal server error"}, 500
 
 if __name__ == '__main__':
+    # Set up here rather than at import, so processes that only import the
+    # app (OCR pool workers) never migrate the database or claim jobs
+
+    # Create or upgrade the schema
+    with app.app_context():
+        run_migrations()
+
+    # Start background workers for report processing
+    if Config.JOB_QUEUE_ENABLED:
+        job_queue.start(app)
+
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.report import Report, ChatMessage
+from src.models.job import Job
+from src.models.report_index import ReportPassage, ReportPassageTerm
+
+# Schema migrations, applied in order and recorded in schema_migrations.
+# Databases created with db.create_all() before migrations existed start
+# at version 1, so every step must be safe to run against a schema that
+# already has some or all of its changes (IF NOT EXISTS, column checks).
+
+def _initial_schema(connection):
+    """
+    Tables as defined by the models (only the missing ones are created)
+    """
+    db.metadata.create_all(bind=connection)
+
+def _report_and_chat_indexes(connection):
+    """
+    Composite indexes for the per-user report list and chat history queries
+    """
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_reports_user_created ON reports (user_id, created_at)'
+    ))
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_chat_messages_report_user_timestamp '
+        'ON chat_messages (report_id, user_id, timestamp)'
+    ))
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_chat_messages_user_timestamp ON chat_messages (user_id, timestamp)'
+    ))
+
+def _report_content_hash(connection):
+    """
+    Content hash on reports, so a report's OCR cache entry can be removed
+    with it; existing reports take it from their processing job's payload
+    """
+    if not column_exists(connection, 'reports', 'content_hash'):
+        connection.execute(text('ALTER TABLE reports ADD COLUMN content_hash VARCHAR(64)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_reports_content_hash ON reports (content_hash)'))
+
+    rows = connection.execute(text(
+        'SELECT jobs.report_id, jobs.payload FROM jobs JOIN reports ON reports.id = jobs.report_id '
+        "WHERE jobs.kind = 'process_report' AND reports.content_hash IS NULL ORDER BY jobs.id"
+    )).fetchall()
+    for report_id, payload in rows:
+        try:
+            content_hash = json.loads(payload or '{}').get('content_hash')
+        except ValueError:
+            continue
+        if content_hash:
+            connection.execute(
+                text('UPDATE reports SET content_hash = :content_hash WHERE id = :report_id'),
+                {'content_hash': content_hash, 'report_id': report_id}
+            )
+
+MIGRATIONS = [
+    (1, 'initial_schema', _initial_schema),
+    (2, 'report_and_chat_indexes', _report_and_chat_indexes),
+    (3, 'report_content_hash', _report_content_hash),
+]
+
+def column_exists(connection, table, column):
+    """
+    Whether `table` already has `column`, for migrations that add columns
+    """
+    rows = connection.execute(text(f'PRAGMA table_info({table})')).fetchall()
+    return any(row[1] == column for row in rows)
+
+def run_migrations(target=None):
+    """
+    Apply pending migrations up to version `target` (all by default), each
+    in its own transaction. Must be called inside an application context.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL)'
+        ))
+        applied = {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+    for version, name, migrate in MIGRATIONS:
+        if version in applied or (target is not None and version > target):
+            continue
+
+        try:
+            with db.engine.begin() as connection:
+                migrate(connection)
+                connection.execute(
+                    text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                    {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+                )
+            print(f"Applied migration {version:04d} {name}")
+        except IntegrityError:
+            # Another process applied it first
+            pass
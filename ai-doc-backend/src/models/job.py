@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. 'process_report'
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=True)
+    payload = db.Column(db.Text, nullable=True)  # JSON string of handler arguments
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    stage = db.Column(db.String(50), nullable=True)  # last stage reported by the handler
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)  # heartbeat of the worker holding the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def get_payload(self):
+        if not self.payload:
+            return {}
+        try:
+            return json.loads(self.payload)
+        except ValueError:
+            return {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'report_id': self.report_id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
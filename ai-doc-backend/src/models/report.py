@@ -3,19 +3,24 @@ from src.models.user import db
 
 class Report(db.Model):
     __tablename__ = 'reports'
+    __table_args__ = (
+        db.Index('ix_reports_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     file_type = db.Column(db.String(10), nullable=False)  # pdf, image, text
     file_path = db.Column(db.String(500), nullable=True)
-    original_content = db.Column(db.Text, nullable=True)
-    translated_content = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the uploaded file, keys the OCR cache
+    # Large text columns are loaded together, on first access, so lists don't pay for them
+    original_content = db.deferred(db.Column(db.Text, nullable=True), group='content')
+    translated_content = db.deferred(db.Column(db.Text, nullable=True), group='content')
     translated_language = db.Column(db.String(10), nullable=True)
-    explanation = db.Column(db.Text, nullable=True)
-    health_tips = db.Column(db.Text, nullable=True)
+    explanation = db.deferred(db.Column(db.Text, nullable=True), group='content')
+    health_tips = db.deferred(db.Column(db.Text, nullable=True), group='content')
     key_findings = db.Column(db.Text, nullable=True)  # JSON string of findings
-    status = db.Column(db.String(20), default='processing')  # processing, processed, failed
+    status = db.Column(db.String(20), default='processing')  # queued, extracting, translating, analyzing, processed, failed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -39,9 +44,34 @@ class Report(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+    
+    def to_summary_dict(self):
+        """
+        The fields shown in report lists, without the report's content
+        """
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'title': self.title,
+            'file_type': self.file_type,
+            'translated_language': self.translated_language,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Columns to_summary_dict needs, for load_only()
+REPORT_SUMMARY_COLUMNS = (
+    Report.id, Report.user_id, Report.title, Report.file_type, Report.translated_language,
+    Report.status, Report.created_at, Report.updated_at
+)
 
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        db.Index('ix_chat_messages_report_user_timestamp', 'report_id', 'user_id', 'timestamp'),
+        db.Index('ix_chat_messages_user_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False)
@@ -0,0 +1,22 @@
+from src.models.user import db
+
+class ReportPassage(db.Model):
+    __tablename__ = 'report_passages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)  # order within the report
+    content = db.Column(db.Text, nullable=False)
+    length = db.Column(db.Integer, nullable=False)  # number of indexed terms
+
+class ReportPassageTerm(db.Model):
+    __tablename__ = 'report_passage_terms'
+    __table_args__ = (
+        db.Index('ix_report_passage_terms_report_term', 'report_id', 'term'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False)
+    passage_id = db.Column(db.Integer, db.ForeignKey('report_passages.id'), nullable=False)
+    term = db.Column(db.String(100), nullable=False)
+    frequency = db.Column(db.Integer, nullable=False)
@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from src.utils.auth_middleware import token_required
-from src.services.ai_service import AIService
+from src.utils.sse import sse_event, SSE_HEADERS
+from src.services.ai_service import AIService, EXPLANATION_FALLBACK
 from src.services.translation_service import TranslationService
+from src.services.llm_cache import llm_cache
+from src.services.http_clients import get_pool_stats
+from src.services.translation_memory import translation_memory
+from src.services.provider_router import provider_router
+from src.services.prompt_budget import prompt_stats, tiktoken
 
 ai_bp = Blueprint('ai', __name__)
 
@@ -27,10 +33,16 @@ def translate_text():
             text, target_language, source_language
         )
         
-        # Detect source language if auto
+        # Detect source language if auto: from the script when it is
+        # distinctive, else as reported while translating, and only then
+        # with a separate detect request
         detected_language = None
         if source_language == 'auto':
-            detected_language = translation_service.detect_language(text)
+            detected_language = (
+                translation_service.detect_language_locally(text)
+                or translation_service.get_detected_source_language()
+                or translation_service.detect_language(text)
+            )
         
         return jsonify({
             'originalText': text,
@@ -42,6 +54,43 @@ def translate_text():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@ai_bp.route('/translate/batch', methods=['POST'])
+@token_required
+def translate_batch():
+    try:
+        data = request.get_json()
+        
+        texts = data.get('texts')
+        target_languages = data.get('targetLanguages')
+        source_language = data.get('sourceLanguage', 'auto')
+        
+        # Validate required fields
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts must be a non-empty list of strings'}), 400
+        
+        if not isinstance(target_languages, list) or not target_languages:
+            return jsonify({'error': 'targetLanguages must be a non-empty list'}), 400
+        
+        target_languages = list(dict.fromkeys(target_languages))
+        
+        # Initialize translation service
+        translation_service = TranslationService()
+        
+        # Translate every text into every language in as few requests as possible
+        translations = translation_service.translate_batch(
+            texts, target_languages, source_language
+        )
+        
+        return jsonify({
+            'originalTexts': texts,
+            'translations': translations,
+            'sourceLanguage': source_language,
+            'targetLanguages': target_languages
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @ai_bp.route('/explain', methods=['POST'])
 @token_required
 def explain_medical_content():
@@ -70,6 +119,52 @@ def explain_medical_content():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@ai_bp.route('/explain/stream', methods=['POST'])
+@token_required
+def stream_medical_explanation():
+    """
+    Same as /explain, but the explanation is streamed as Server-Sent Events:
+    a 'section' event per paragraph as it is generated, then 'done' with
+    the full text
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not data.get('content'):
+            return jsonify({'error': 'Content is required'}), 400
+        
+        content = data.get('content')
+        language = data.get('language', request.current_user.preferred_language)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        ai_service = AIService()
+        sections = []
+        
+        try:
+            for section in ai_service.stream_explain_medical_report(content, language):
+                sections.append(section)
+                yield sse_event('section', {'section': section})
+        except Exception as e:
+            print(f"Error in stream_medical_explanation: {e}")
+            if not sections:
+                yield sse_event('error', {'error': 'Failed to generate explanation', 'explanation': EXPLANATION_FALLBACK})
+                return
+        
+        yield sse_event('done', {
+            'explanation': ''.join(sections),
+            'language': language
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
 @ai_bp.route('/health-tips', methods=['POST'])
 @token_required
 def generate_health_tips():
@@ -149,22 +244,72 @@ def analyze_medical_report():
             )
         
         # Generate all AI analyses
-        explanation = ai_service.explain_medical_report(translated_content, language)
-        health_tips = ai_service.generate_health_tips(translated_content, language)
-        key_findings = ai_service.extract_key_findings(translated_content)
+        analysis = ai_service.analyze_report(
+            translated_content, language, combined=data.get('combined')
+        )
         
         return jsonify({
             'originalContent': content,
             'translatedContent': translated_content if language != 'en' else None,
-            'explanation': explanation,
-            'healthTips': health_tips,
-            'keyFindings': key_findings,
+            'explanation': analysis['explanation'],
+            'healthTips': analysis['health_tips'],
+            'keyFindings': analysis['key_findings'],
             'language': language
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@ai_bp.route('/cache-stats', methods=['GET'])
+@token_required
+def get_llm_cache_stats():
+    try:
+        return jsonify({
+            'llmCache': llm_cache.stats() if llm_cache else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/pool-stats', methods=['GET'])
+@token_required
+def get_http_pool_stats():
+    try:
+        return jsonify({'httpPools': get_pool_stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/translation-memory', methods=['GET'])
+@token_required
+def get_translation_memory_stats():
+    try:
+        return jsonify({'translationMemory': translation_memory.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/provider-health', methods=['GET'])
+@token_required
+def get_provider_health():
+    try:
+        return jsonify({'providers': provider_router.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/prompt-stats', methods=['GET'])
+@token_required
+def get_prompt_stats():
+    try:
+        return jsonify({
+            'prompts': prompt_stats.stats(),
+            'tokenCounter': 'tiktoken' if tiktoken else 'estimate'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @ai_bp.route('/supported-languages', methods=['GET'])
 def get_supported_languages():
     try:
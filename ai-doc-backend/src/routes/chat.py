@@ -1,11 +1,38 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy.orm import undefer_group
 from src.models.user import db
 from src.models.report import Report, ChatMessage
 from src.utils.auth_middleware import token_required
-from src.services.ai_service import AIService
+from src.utils.sse import sse_event, SSE_HEADERS
+from src.utils.pagination import get_page_args, keyset_page
+from src.services.ai_service import AIService, CHAT_FALLBACK
+from src.services.report_index import search_report
 
 chat_bp = Blueprint('chat', __name__)
 
+GENERAL_CHAT_CONTEXT = "No specific medical report provided. Provide general health guidance."
+
+def get_recent_chat_history(report_id, user_id):
+    """
+    Last 10 messages of a report's conversation, oldest first
+    """
+    if not report_id:
+        return []
+    
+    recent_messages = ChatMessage.query.filter_by(
+        report_id=report_id,
+        user_id=user_id
+    ).order_by(ChatMessage.timestamp.desc()).limit(10).all()
+    
+    return [
+        {
+            'sender': msg.sender,
+            'message': msg.message,
+            'timestamp': msg.timestamp.isoformat()
+        }
+        for msg in reversed(recent_messages)
+    ]
+
 @chat_bp.route('/message', methods=['POST'])
 @token_required
 def send_message():
@@ -23,7 +50,7 @@ def send_message():
         # Get report if specified
         report = None
         if report_id:
-            report = Report.query.filter_by(
+            report = Report.query.options(undefer_group('content')).filter_by(
                 id=report_id, 
                 user_id=request.current_user.id
             ).first()
@@ -31,6 +58,10 @@ def send_message():
             if not report:
                 return jsonify({'error': 'Report not found'}), 404
         
+        # Get chat history for context, before the new message is added
+        # (the query would autoflush it into the history)
+        chat_history = get_recent_chat_history(report_id, request.current_user.id)
+        
         # Save user message
         user_message = ChatMessage(
             report_id=report_id,
@@ -40,40 +71,24 @@ def send_message():
         )
         db.session.add(user_message)
         
-        # Get chat history for context
-        chat_history = []
-        if report_id:
-            recent_messages = ChatMessage.query.filter_by(
-                report_id=report_id,
-                user_id=request.current_user.id
-            ).order_by(ChatMessage.timestamp.desc()).limit(10).all()
-            
-            chat_history = [
-                {
-                    'sender': msg.sender,
-                    'message': msg.message,
-                    'timestamp': msg.timestamp.isoformat()
-                }
-                for msg in reversed(recent_messages)
-            ]
-        
         # Generate AI response
         ai_service = AIService()
         
         if report:
-            # Chat about specific report
+            # Chat about specific report, sending only the passages relevant to the question
             report_content = report.translated_content or report.original_content
             ai_response = ai_service.chat_with_ai_doctor(
                 message, 
                 report_content, 
                 chat_history, 
-                language
+                language,
+                search_report(report, message)
             )
         else:
             # General health chat
             ai_response = ai_service.chat_with_ai_doctor(
                 message, 
-                "No specific medical report provided. Provide general health guidance.", 
+                GENERAL_CHAT_CONTEXT, 
                 chat_history, 
                 language
             )
@@ -98,12 +113,121 @@ def send_message():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@chat_bp.route('/message/stream', methods=['POST'])
+@token_required
+def stream_message():
+    """
+    Same as /message, but the AI reply is streamed as Server-Sent Events:
+    'token' events while it is generated, then a 'done' event with the
+    saved messages. The reply is saved even if the client disconnects.
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not data.get('message'):
+            return jsonify({'error': 'Message is required'}), 400
+        
+        report_id = data.get('reportId')
+        message = data.get('message')
+        language = data.get('language', request.current_user.preferred_language)
+        user_id = request.current_user.id
+        
+        # Get report if specified
+        report = None
+        if report_id:
+            report = Report.query.options(undefer_group('content')).filter_by(
+                id=report_id, 
+                user_id=user_id
+            ).first()
+            
+            if not report:
+                return jsonify({'error': 'Report not found'}), 404
+        
+        # Get chat history for context, before the new message is added
+        # (the query would autoflush it into the history)
+        chat_history = get_recent_chat_history(report_id, user_id)
+        
+        # Save user message before streaming starts
+        user_message = ChatMessage(
+            report_id=report_id,
+            user_id=user_id,
+            sender='user',
+            message=message
+        )
+        db.session.add(user_message)
+        
+        # Get the passages relevant to the question for context
+        if report:
+            report_content = report.translated_content or report.original_content
+            passages = search_report(report, message)
+        else:
+            report_content = GENERAL_CHAT_CONTEXT
+            passages = None
+        
+        db.session.commit()
+        
+        user_message_data = user_message.to_dict()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        ai_service = AIService()
+        tokens = []
+        failed = False
+        
+        try:
+            yield sse_event('start', {'userMessage': user_message_data})
+            
+            for token in ai_service.stream_chat_with_ai_doctor(
+                message, report_content, chat_history, language, passages
+            ):
+                tokens.append(token)
+                yield sse_event('token', {'token': token})
+        except Exception as e:
+            print(f"Error in stream_message: {e}")
+            failed = True
+        finally:
+            # Save AI response once the stream ends, including when the
+            # client disconnects (GeneratorExit) part way through
+            ai_response = ''.join(tokens) if tokens else CHAT_FALLBACK
+            ai_message = ChatMessage(
+                report_id=report_id,
+                user_id=user_id,
+                sender='ai',
+                message=ai_response
+            )
+            try:
+                db.session.add(ai_message)
+                db.session.commit()
+            except Exception as e:
+                print(f"Could not save streamed chat reply: {e}")
+                db.session.rollback()
+        
+        if failed:
+            yield sse_event('error', {'error': 'Failed to generate a response', 'aiResponse': ai_message.to_dict()})
+        else:
+            yield sse_event('done', {'aiResponse': ai_message.to_dict()})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
 @chat_bp.route('/history/<int:report_id>', methods=['GET'])
 @token_required
 def get_chat_history(report_id):
+    """
+    A report's conversation, oldest first. With ?limit= and/or ?cursor=
+    only the latest page is returned (still oldest first), and nextCursor
+    fetches the messages before it.
+    """
     try:
         # Verify report belongs to user
-        report = Report.query.filter_by(
+        report = Report.query.options(undefer_group('content')).filter_by(
             id=report_id, 
             user_id=request.current_user.id
         ).first()
@@ -112,17 +236,31 @@ def get_chat_history(report_id):
             return jsonify({'error': 'Report not found'}), 404
         
         # Get chat messages
-        messages = ChatMessage.query.filter_by(
+        query = ChatMessage.query.filter_by(
             report_id=report_id,
             user_id=request.current_user.id
-        ).order_by(ChatMessage.timestamp.asc()).all()
+        )
+        
+        limit, cursor = get_page_args()
+        if limit:
+            try:
+                messages, next_cursor = keyset_page(query, ChatMessage.timestamp, ChatMessage.id, limit, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            messages.reverse()
+        else:
+            messages = query.order_by(ChatMessage.timestamp.asc()).all()
         
         messages_data = [message.to_dict() for message in messages]
         
-        return jsonify({
+        response = {
             'messages': messages_data,
             'report': report.to_dict()
-        }), 200
+        }
+        if limit:
+            response['nextCursor'] = next_cursor
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -130,11 +268,23 @@ def get_chat_history(report_id):
 @chat_bp.route('/history', methods=['GET'])
 @token_required
 def get_all_chat_history():
+    """
+    All of the user's messages, newest first, grouped by report. With
+    ?limit= and/or ?cursor= one page of messages is returned along with
+    the nextCursor to fetch the following one.
+    """
     try:
-        # Get all chat messages for user
-        messages = ChatMessage.query.filter_by(
-            user_id=request.current_user.id
-        ).order_by(ChatMessage.timestamp.desc()).all()
+        # Get chat messages for user
+        query = ChatMessage.query.filter_by(user_id=request.current_user.id)
+        
+        limit, cursor = get_page_args()
+        if limit:
+            try:
+                messages, next_cursor = keyset_page(query, ChatMessage.timestamp, ChatMessage.id, limit, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            messages = query.order_by(ChatMessage.timestamp.desc()).all()
         
         # Group by report
         chat_by_report = {}
@@ -144,7 +294,11 @@ def get_all_chat_history():
                 chat_by_report[report_id] = []
             chat_by_report[report_id].append(message.to_dict())
         
-        return jsonify({'chatHistory': chat_by_report}), 200
+        response = {'chatHistory': chat_by_report}
+        if limit:
+            response['nextCursor'] = next_cursor
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,13 +1,19 @@
 import os
 import json
+import hashlib
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import load_only, undefer_group
 from src.models.user import db
-from src.models.report import Report
+from src.models.report import Report, REPORT_SUMMARY_COLUMNS
+from src.models.job import Job
 from src.utils.auth_middleware import token_required
-from src.services.ocr_service import OCRService
+from src.utils.pagination import get_page_args, keyset_page
 from src.services.translation_service import TranslationService
 from src.services.ai_service import AIService
+from src.services.report_pipeline import enqueue_report_processing
+from src.services.report_index import build_report_index, delete_report_index
+from src.services.ocr_cache import ocr_cache
 from src.config import Config
 
 reports_bp = Blueprint('reports', __name__)
@@ -16,6 +22,20 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
+def save_file_with_hash(file, upload_path, chunk_size=65536):
+    """
+    Save an uploaded file while computing its SHA-256 in the same pass
+    """
+    sha256 = hashlib.sha256()
+    with open(upload_path, 'wb') as output:
+        while True:
+            chunk = file.stream.read(chunk_size)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            output.write(chunk)
+    return sha256.hexdigest()
+
 @reports_bp.route('/upload', methods=['POST'])
 @token_required
 def upload_report():
@@ -47,8 +67,8 @@ def upload_report():
         # Ensure upload directory exists
         os.makedirs(os.path.dirname(upload_path), exist_ok=True)
         
-        # Save file
-        file.save(upload_path)
+        # Save file and hash its content for the OCR cache
+        content_hash = save_file_with_hash(file, upload_path)
         
         # Create report record
         report = Report(
@@ -56,67 +76,21 @@ def upload_report():
             title=title,
             file_type=file_extension,
             file_path=upload_path,
-            status='processing'
+            content_hash=content_hash,
+            status='queued'
         )
         
         db.session.add(report)
         db.session.commit()
         
-        # Process file in background (for now, we'll do it synchronously)
-        try:
-            # Extract text from file
-            ocr_service = OCRService()
-            extracted_text = ocr_service.extract_text_from_file(upload_path, file_extension)
-            
-            if not extracted_text.strip():
-                report.status = 'failed'
-                db.session.commit()
-                return jsonify({'error': 'Could not extract text from file'}), 400
-            
-            # Update report with extracted text
-            report.original_content = extracted_text
-            
-            # Translate if needed
-            translation_service = TranslationService()
-            if target_language != 'en':
-                translated_text = translation_service.translate_text(
-                    extracted_text, target_language, 'auto'
-                )
-                report.translated_content = translated_text
-                report.translated_language = target_language
-            else:
-                report.translated_content = extracted_text
-                report.translated_language = 'en'
-            
-            # Generate AI explanation
-            ai_service = AIService()
-            content_for_analysis = report.translated_content or report.original_content
-            
-            explanation = ai_service.explain_medical_report(content_for_analysis, target_language)
-            report.explanation = explanation
-            
-            # Generate health tips
-            health_tips = ai_service.generate_health_tips(content_for_analysis, target_language)
-            report.health_tips = health_tips
-            
-            # Extract key findings
-            key_findings = ai_service.extract_key_findings(content_for_analysis)
-            report.key_findings = json.dumps(key_findings)
-            
-            # Update status
-            report.status = 'processed'
-            db.session.commit()
-            
-            return jsonify({
-                'message': 'Report uploaded and processed successfully',
-                'report': report.to_dict()
-            }), 201
-            
-        except Exception as processing_error:
-            print(f"Processing error: {processing_error}")
-            report.status = 'failed'
-            db.session.commit()
-            return jsonify({'error': 'Failed to process report'}), 500
+        # Process file in the background job queue
+        job = enqueue_report_processing(report, target_language, content_hash)
+        
+        return jsonify({
+            'message': 'Report uploaded and queued for processing',
+            'jobId': job.id,
+            'report': report.to_dict()
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -125,25 +99,65 @@ def upload_report():
 @reports_bp.route('/', methods=['GET'])
 @token_required
 def get_reports():
+    """
+    The user's reports, newest first. With ?limit= and/or ?cursor= one
+    page is returned along with the nextCursor to fetch the following one.
+    With ?fields=summary only the list fields are loaded and returned,
+    without the report content, explanation, health tips or key findings.
+    """
     try:
-        reports = Report.query.filter_by(user_id=request.current_user.id)\
-                             .order_by(Report.created_at.desc()).all()
-        
-        reports_data = []
-        for report in reports:
-            report_dict = report.to_dict()
-            # Parse key findings if available
-            if report.key_findings:
-                try:
-                    report_dict['key_findings'] = json.loads(report.key_findings)
-                except:
-                    report_dict['key_findings'] = []
-            else:
-                report_dict['key_findings'] = []
-            
-            reports_data.append(report_dict)
+        fields = request.args.get('fields')
+        if fields not in (None, 'summary'):
+            return jsonify({'error': 'Unsupported fields, use fields=summary'}), 400
+        
+        query = Report.query.filter_by(user_id=request.current_user.id)
+        if fields == 'summary':
+            query = query.options(load_only(*REPORT_SUMMARY_COLUMNS))
+        else:
+            query = query.options(undefer_group('content'))
         
-        return jsonify({'reports': reports_data}), 200
+        limit, cursor = get_page_args()
+        if limit:
+            try:
+                reports, next_cursor = keyset_page(query, Report.created_at, Report.id, limit, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            reports = query.order_by(Report.created_at.desc()).all()
+        
+        if fields == 'summary':
+            reports_data = [report.to_summary_dict() for report in reports]
+        else:
+            reports_data = [_report_to_dict(report) for report in reports]
+        
+        response = {'reports': reports_data}
+        if limit:
+            response['nextCursor'] = next_cursor
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _report_to_dict(report):
+    """
+    A report with its key findings parsed
+    """
+    report_dict = report.to_dict()
+    if report.key_findings:
+        try:
+            report_dict['key_findings'] = json.loads(report.key_findings)
+        except:
+            report_dict['key_findings'] = []
+    else:
+        report_dict['key_findings'] = []
+    return report_dict
+
+@reports_bp.route('/ocr-cache', methods=['GET'])
+@token_required
+def get_ocr_cache_stats():
+    try:
+        return jsonify({'ocrCache': ocr_cache.stats()}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -151,6 +165,23 @@ def get_reports():
 @reports_bp.route('/<int:report_id>', methods=['GET'])
 @token_required
 def get_report(report_id):
+    try:
+        report = Report.query.options(undefer_group('content')).filter_by(
+            id=report_id, 
+            user_id=request.current_user.id
+        ).first()
+        
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+        
+        return jsonify({'report': _report_to_dict(report)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/<int:report_id>/status', methods=['GET'])
+@token_required
+def get_report_status(report_id):
     try:
         report = Report.query.filter_by(
             id=report_id, 
@@ -160,17 +191,15 @@ def get_report(report_id):
         if not report:
             return jsonify({'error': 'Report not found'}), 404
         
-        report_dict = report.to_dict()
-        # Parse key findings if available
-        if report.key_findings:
-            try:
-                report_dict['key_findings'] = json.loads(report.key_findings)
-            except:
-                report_dict['key_findings'] = []
-        else:
-            report_dict['key_findings'] = []
+        # Latest job for this report
+        job = Job.query.filter_by(report_id=report.id)\
+                       .order_by(Job.id.desc()).first()
         
-        return jsonify({'report': report_dict}), 200
+        return jsonify({
+            'reportId': report.id,
+            'status': report.status,
+            'job': job.to_dict() if job else None
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -194,10 +223,17 @@ def delete_report(report_id):
             except:
                 pass  # Continue even if file deletion fails
         
-        # Delete report from database
+        # Delete report, its passage index and any pending jobs from database
+        Job.query.filter_by(report_id=report.id).delete()
+        content_hash, file_type = report.content_hash, report.file_type
+        delete_report_index(report.id)
         db.session.delete(report)
         db.session.commit()
         
+        # Drop the extracted text from the OCR cache unless another report has the same file
+        if content_hash and not Report.query.filter_by(content_hash=content_hash).first():
+            ocr_cache.delete(ocr_cache.make_key(content_hash, file_type))
+        
         return jsonify({'message': 'Report deleted successfully'}), 200
         
     except Exception as e:
@@ -208,7 +244,7 @@ def delete_report(report_id):
 @token_required
 def reprocess_report(report_id):
     try:
-        report = Report.query.filter_by(
+        report = Report.query.options(undefer_group('content')).filter_by(
             id=report_id, 
             user_id=request.current_user.id
         ).first()
@@ -233,16 +269,19 @@ def reprocess_report(report_id):
                 report.translated_content = translated_text
                 report.translated_language = target_language
             
-            # Re-generate AI explanation
+            # Re-index passages for chat retrieval
+            build_report_index(report)
+            
+            # Re-generate AI explanation, health tips and key findings
             ai_service = AIService()
             content_for_analysis = report.translated_content or report.original_content
             
-            explanation = ai_service.explain_medical_report(content_for_analysis, target_language)
-            report.explanation = explanation
-            
-            # Re-generate health tips
-            health_tips = ai_service.generate_health_tips(content_for_analysis, target_language)
-            report.health_tips = health_tips
+            analysis = ai_service.analyze_report(
+                content_for_analysis, target_language, combined=data.get('combined')
+            )
+            report.explanation = analysis['explanation']
+            report.health_tips = analysis['health_tips']
+            report.key_findings = json.dumps(analysis['key_findings'])
             
             # Update status
             report.status = 'processed'
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, User
 from src.utils.auth_middleware import token_required
+from src.services.auth_cache import user_cache
 
 user_bp = Blueprint('user', __name__)
 
@@ -39,6 +40,7 @@ def update_profile():
             user.preferred_language = data['preferredLanguage']
         
         db.session.commit()
+        user_cache.invalidate(user.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -60,22 +62,26 @@ def update_profile():
 @token_required
 def get_user_stats():
     try:
+        from sqlalchemy import case, func, select
         from src.models.report import Report, ChatMessage
         
         user = request.current_user
         
-        # Get user statistics
-        total_reports = Report.query.filter_by(user_id=user.id).count()
-        processed_reports = Report.query.filter_by(user_id=user.id, status='processed').count()
-        total_messages = ChatMessage.query.filter_by(user_id=user.id).count()
-        
-        # Get recent activity (last 7 days)
+        # Recent activity covers the last 7 days
         from datetime import datetime, timedelta
         week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_reports = Report.query.filter(
-            Report.user_id == user.id,
-            Report.created_at >= week_ago
-        ).count()
+        
+        # All statistics in one query: conditional counts over the user's
+        # reports, with the message count as a subquery
+        total_messages = select(func.count(ChatMessage.id))\
+                         .where(ChatMessage.user_id == user.id)\
+                         .scalar_subquery()
+        total_reports, processed_reports, recent_reports, total_messages = db.session.query(
+            func.count(Report.id),
+            func.count(case((Report.status == 'processed', 1))),
+            func.count(case((Report.created_at >= week_ago, 1))),
+            total_messages
+        ).filter(Report.user_id == user.id).one()
         
         return jsonify({
             'stats': {
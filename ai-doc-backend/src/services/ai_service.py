@@ -1,15 +1,159 @@
+import json
+import queue
+import threading
+import time
 import openai
+from concurrent.futures import ThreadPoolExecutor
 from src.config import Config
+from src.services.llm_cache import llm_cache
+from src.services.http_clients import get_http_client
+from src.services.prompt_budget import (
+    PromptBudget, MESSAGE_OVERHEAD_TOKENS, split_report_sections, rank_sections, join_sections, prompt_stats
+)
+
+EXPLANATION_FALLBACK = "I apologize, but I'm unable to analyze this report at the moment. Please try again later or consult with your healthcare provider."
+CHAT_FALLBACK = "I apologize, but I'm experiencing technical difficulties. Please try again later or consult with your healthcare provider."
+HEALTH_TIPS_FALLBACK = "I'm unable to generate health tips at the moment. Please consult with your healthcare provider for personalized advice."
+
+CHAT_MODEL = "gpt-4"
+
+# Threads shared by all AIService instances for concurrent analysis calls
+_analysis_pool = ThreadPoolExecutor(max_workers=Config.AI_MAX_CONCURRENT_CALLS, thread_name_prefix='ai-call')
+
+# OpenAI client shared by all AIService instances (thread-safe, keep-alive pool)
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            _openai_client = openai.OpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                timeout=Config.AI_CALL_TIMEOUT,
+                http_client=get_http_client('openai', Config.AI_CALL_TIMEOUT)
+            )
+        return _openai_client
 
 class AIService:
     def __init__(self):
         openai.api_key = Config.OPENAI_API_KEY
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.client = get_openai_client()
+    
+    def _complete(self, model, messages, max_tokens, temperature, parse=None):
+        """
+        Run a stateless chat completion through the response cache. With
+        `parse`, the text is only cached once it has been parsed successfully.
+        Chat turns don't go through here: their history makes them unique.
+        """
+        cache_key = None
+        if llm_cache:
+            cache_key = llm_cache.make_key(model, temperature, max_tokens, messages)
+            cached_text = llm_cache.get(cache_key)
+            if cached_text is not None:
+                return parse(cached_text) if parse else cached_text
+        
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        response_text = response.choices[0].message.content
+        
+        result = parse(response_text) if parse else response_text
+        if cache_key:
+            llm_cache.set(cache_key, response_text)
+        
+        return result
     
     def explain_medical_report(self, content, language='en'):
         """
         Explain medical report content in simple terms
         """
+        try:
+            return self._complete(
+                model="gpt-4",
+                messages=self._build_explanation_messages(content, language),
+                max_tokens=1500,
+                temperature=0.3
+            )
+        except Exception as e:
+            print(f"Error in explain_medical_report: {e}")
+            return EXPLANATION_FALLBACK
+    
+    def stream_explain_medical_report(self, content, language='en', cancelled=None):
+        """
+        Explain medical report content, yielding the explanation section by
+        section (paragraph by paragraph) as the model generates it. The
+        sections concatenate to the full explanation, which is cached like
+        the non-streaming call. Errors are raised to the caller. Once the
+        `cancelled` event is set the upstream stream is closed and nothing
+        more is yielded (or cached).
+        """
+        messages = self._build_explanation_messages(content, language)
+        
+        cache_key = None
+        if llm_cache:
+            cache_key = llm_cache.make_key("gpt-4", 0.3, 1500, messages)
+            cached_text = llm_cache.get(cache_key)
+            if cached_text is not None:
+                yield cached_text
+                return
+        
+        stream = self.client.chat.completions.create(
+            model="gpt-4",
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.3,
+            stream=True
+        )
+        
+        sections = []
+        buffer = ''
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    return
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                buffer += chunk.choices[0].delta.content
+                
+                # Emit every section that has been closed by a blank line
+                while '\n\n' in buffer:
+                    section, buffer = buffer.split('\n\n', 1)
+                    sections.append(section + '\n\n')
+                    yield sections[-1]
+            
+            if buffer:
+                sections.append(buffer)
+                yield buffer
+        finally:
+            stream.close()
+        
+        if cache_key:
+            llm_cache.set(cache_key, ''.join(sections))
+    
+    def _explain_with_progress(self, content, language, on_partial, cancelled=None):
+        """
+        Stream the explanation, reporting the text generated so far after
+        each section. Returns the full explanation, or the text so far if
+        `cancelled` is set first.
+        """
+        explanation = ''
+        try:
+            for section in self.stream_explain_medical_report(content, language, cancelled):
+                explanation += section
+                on_partial(explanation)
+        except Exception as e:
+            print(f"Error in stream_explain_medical_report: {e}")
+        
+        return explanation or EXPLANATION_FALLBACK
+    
+    def _build_explanation_messages(self, content, language='en'):
+        """
+        Prompt for the report explanation
+        """
         language_names = {
             'en': 'English',
             'hi': 'Hindi',
@@ -59,21 +203,10 @@ class AIService:
         - Respond in {lang_name} language
         """
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a compassionate medical doctor who explains medical reports in simple, understandable terms."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error in explain_medical_report: {e}")
-            return f"I apologize, but I'm unable to analyze this report at the moment. Please try again later or consult with your healthcare provider."
+        return [
+            {"role": "system", "content": "You are a compassionate medical doctor who explains medical reports in simple, understandable terms."},
+            {"role": "user", "content": prompt}
+        ]
     
     def generate_health_tips(self, content, language='en'):
         """
@@ -128,7 +261,7 @@ class AIService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            return self._complete(
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are a health and wellness expert providing practical, evidence-based health tips."},
@@ -137,15 +270,61 @@ class AIService:
                 max_tokens=1000,
                 temperature=0.4
             )
+        except Exception as e:
+            print(f"Error in generate_health_tips: {e}")
+            return HEALTH_TIPS_FALLBACK
+    
+    def chat_with_ai_doctor(self, message, report_content, chat_history=None, language='en', passages=None):
+        """
+        Chat with AI doctor about the medical report. `passages` are the
+        (position, text) report passages retrieved for the question, most
+        relevant first; when given they replace the full report content.
+        """
+        messages = self._build_chat_messages(message, report_content, chat_history, language, passages)
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=800,
+                temperature=0.3
+            )
             
             return response.choices[0].message.content
         except Exception as e:
-            print(f"Error in generate_health_tips: {e}")
-            return f"I'm unable to generate health tips at the moment. Please consult with your healthcare provider for personalized advice."
+            print(f"Error in chat_with_ai_doctor: {e}")
+            return CHAT_FALLBACK
     
-    def chat_with_ai_doctor(self, message, report_content, chat_history=None, language='en'):
+    def stream_chat_with_ai_doctor(self, message, report_content, chat_history=None, language='en', passages=None):
         """
-        Chat with AI doctor about the medical report
+        Chat with AI doctor, yielding the reply in pieces as the model
+        generates it. Errors are raised to the caller; closing the generator
+        closes the upstream stream so generation stops.
+        """
+        messages = self._build_chat_messages(message, report_content, chat_history, language, passages)
+        
+        stream = self.client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            max_tokens=800,
+            temperature=0.3,
+            stream=True
+        )
+        
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    
+    def _build_chat_messages(self, message, report_content, chat_history=None, language='en', passages=None, model=CHAT_MODEL):
+        """
+        Build the system prompt, recent history and user message for a chat
+        turn within the model's prompt token budget. The instructions and
+        the question always go in; then, while they fit, the last exchange,
+        the report sections most relevant to the question (the retrieved
+        `passages` when given) and older history, newest first.
         """
         language_names = {
             'en': 'English',
@@ -175,11 +354,12 @@ class AIService:
         
         lang_name = language_names.get(language, 'English')
         
-        system_prompt = f"""
+        def system_prompt(report_excerpt):
+            return f"""
         You are a compassionate AI doctor assistant. You have access to the patient's medical report and can answer questions about it.
         
         Medical Report Content:
-        {report_content}
+        {report_excerpt}
         
         Guidelines:
         - Be empathetic and understanding
@@ -190,31 +370,55 @@ class AIService:
         - If asked about something not in the report, acknowledge the limitation
         """
         
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add chat history if available
+        history = []
         if chat_history:
             for chat in chat_history[-10:]:  # Last 10 messages for context
                 role = "user" if chat['sender'] == 'user' else "assistant"
-                messages.append({"role": role, "content": chat['message']})
+                history.append({"role": role, "content": chat['message']})
+        
+        budget = PromptBudget(model)
+        budget.add(system_prompt(''), MESSAGE_OVERHEAD_TOKENS, force=True)
+        budget.add(message, MESSAGE_OVERHEAD_TOKENS, force=True)
+        
+        # History is only ever cut from the oldest end, so it stays contiguous
+        first_kept = len(history)
+        
+        def add_history(down_to):
+            nonlocal first_kept
+            while first_kept > down_to:
+                if not budget.add(history[first_kept - 1]['content'], MESSAGE_OVERHEAD_TOKENS):
+                    return False
+                first_kept -= 1
+            return True
+        
+        history_complete = add_history(max(len(history) - 2, 0))
+        
+        if passages:
+            sections = dict(passages)
+            ranking = [position for position, _ in passages]
+        else:
+            sections = dict(enumerate(split_report_sections(report_content)))
+            ranking = rank_sections(list(sections.values()), message)
+        
+        chosen = set()
+        for position in ranking:
+            if budget.add(sections[position]):
+                chosen.add(position)
+        
+        if history_complete:
+            add_history(0)
+        
+        prompt_stats.record(model, budget.used, budget.budget, budget.trimmed)
+        
+        messages = [
+            {"role": "system", "content": system_prompt(join_sections(sections, chosen))}
+        ]
+        messages.extend(history[first_kept:])
         
         # Add current message
         messages.append({"role": "user", "content": message})
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=800,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error in chat_with_ai_doctor: {e}")
-            return f"I apologize, but I'm experiencing technical difficulties. Please try again later or consult with your healthcare provider."
+        return messages
     
     def extract_key_findings(self, content):
         """
@@ -237,7 +441,7 @@ class AIService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response_text = self._complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a medical data extraction specialist."},
@@ -247,9 +451,211 @@ class AIService:
                 temperature=0.2
             )
             
-            findings = response.choices[0].message.content.strip().split('\n')
+            findings = response_text.strip().split('\n')
             return [finding.strip('- ').strip() for finding in findings if finding.strip()]
         except Exception as e:
             print(f"Error in extract_key_findings: {e}")
             return []
+    
+    def analyze_report(self, content, language='en', on_result=None, combined=None, on_partial=None):
+        """
+        Generate the explanation, health tips and key findings for a report.
+        With combined analysis (AI_COMBINED_ANALYSIS, or combined=True) one
+        JSON-structured request is tried first. Otherwise, or if that reply
+        is unusable, the three separate calls run concurrently unless
+        AI_CONCURRENT_ANALYSIS is off. Each result is passed to
+        on_result(name, value) as soon as it is ready; a call that fails,
+        runs for longer than AI_CALL_TIMEOUT or waits longer than
+        AI_QUEUE_TIMEOUT for a free slot gets its usual fallback value. With
+        on_partial, the explanation is streamed and on_partial(name, text)
+        receives the text generated so far after each section; if it runs
+        past the deadline the stream is stopped and the text so far is kept.
+        
+        Callbacks always run on the calling thread.
+        """
+        if combined is None:
+            combined = Config.AI_COMBINED_ANALYSIS
+        
+        if combined:
+            results = self.analyze_report_combined(content, language)
+            if results:
+                if on_result:
+                    for name, value in results.items():
+                        on_result(name, value)
+                return results
+        
+        calls = {
+            'explanation': (self.explain_medical_report, (content, language), EXPLANATION_FALLBACK),
+            'health_tips': (self.generate_health_tips, (content, language), HEALTH_TIPS_FALLBACK),
+            'key_findings': (self.extract_key_findings, (content,), [])
+        }
+        results = {}
+        
+        def finish(name, value):
+            results[name] = value
+            if on_result:
+                on_result(name, value)
+        
+        if not Config.AI_CONCURRENT_ANALYSIS:
+            for name, (method, args, fallback) in calls.items():
+                if name == 'explanation' and on_partial:
+                    finish(name, self._explain_with_progress(
+                        content, language, lambda text: on_partial('explanation', text)
+                    ))
+                else:
+                    finish(name, method(*args))
+            return results
+        
+        # Worker threads only post events; the calling thread applies them
+        events = queue.Queue()
+        partials = {}
+        started = {}
+        futures = {}
+        cancelled = threading.Event()
+        
+        def run(name, method, args, fallback):
+            started.setdefault(name, time.monotonic())
+            events.put(('started', name, None))
+            try:
+                value = method(*args)
+            except Exception as e:
+                print(f"Error in analyze_report ({name}): {e}")
+                value = fallback
+            events.put(('result', name, value))
+        
+        for name, (method, args, fallback) in calls.items():
+            if name == 'explanation' and on_partial:
+                method = self._explain_with_progress
+                args = (content, language, lambda text: events.put(('partial', 'explanation', text)), cancelled)
+            futures[name] = _analysis_pool.submit(run, name, method, args, fallback)
+        submitted = time.monotonic()
+        
+        def deadline(name):
+            # A call's time runs from when it starts; waiting for a free slot has its own limit
+            if name in started:
+                return started[name] + Config.AI_CALL_TIMEOUT
+            return submitted + Config.AI_QUEUE_TIMEOUT
+        
+        def apply(kind, name, value):
+            if name in results or kind == 'started':
+                return
+            if kind == 'partial':
+                partials[name] = value
+                on_partial(name, value)
+            else:
+                finish(name, value)
+        
+        while len(results) < len(calls):
+            remaining = min(deadline(name) for name in calls if name not in results) - time.monotonic()
+            try:
+                apply(*events.get(timeout=max(remaining, 0)))
+            except queue.Empty:
+                pass
+            
+            # Apply whatever else arrived before checking deadlines
+            while True:
+                try:
+                    apply(*events.get_nowait())
+                except queue.Empty:
+                    break
+            
+            now = time.monotonic()
+            for name, (method, args, fallback) in calls.items():
+                if name in results or now < deadline(name):
+                    continue
+                
+                if name not in started:
+                    if futures[name].cancel():
+                        # Never started, so it never reaches the API
+                        print(f"analyze_report: {name} waited {Config.AI_QUEUE_TIMEOUT}s for a free slot")
+                        finish(name, fallback)
+                    else:
+                        started.setdefault(name, now)  # picked up just now
+                    continue
+                
+                print(f"analyze_report: {name} timed out after {Config.AI_CALL_TIMEOUT}s")
+                if name == 'explanation':
+                    # Stop the stream so its remaining tokens aren't generated for nothing
+                    cancelled.set()
+                finish(name, partials.get(name) or fallback)
+        
+        return results
+    
+    def analyze_report_combined(self, content, language='en'):
+        """
+        Request the explanation, health tips and key findings in a single
+        JSON response, so the report text is only sent once. Returns None
+        if the call fails or the response doesn't validate.
+        """
+        lang_name = Config.SUPPORTED_LANGUAGES.get(language, 'English')
+        
+        prompt = f"""
+        You are an experienced medical doctor and health educator. Analyze the following medical report.
 
+        Medical Report Content:
+        {content}
+
+        Respond with a single JSON object and nothing else, with exactly these keys:
+        - "explanation": a clear, simple explanation in {lang_name} covering a summary of what the report shows, the medical terms in simple language, what the findings mean for the patient's health, any areas of concern or normal findings, and general recommendations
+        - "health_tips": personalized health tips in {lang_name} covering diet, exercise and lifestyle, preventive measures, when to seek medical attention and general wellness
+        - "key_findings": an array of short strings with the key test results, abnormal and normal findings, diagnoses mentioned and recommendations
+
+        Important:
+        - Use simple, non-technical language that a patient can understand
+        - Be empathetic and reassuring while being accurate
+        - Always emphasize that this is for informational purposes only
+        - Recommend consulting with healthcare providers for medical decisions
+        """
+        
+        try:
+            return self._complete(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a compassionate medical doctor who explains medical reports in simple, understandable terms. You always answer with valid JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=3000,
+                temperature=0.3,
+                parse=self._parse_combined_analysis
+            )
+        except Exception as e:
+            print(f"Error in analyze_report_combined: {e}")
+            return None
+    
+    def _parse_combined_analysis(self, raw_response):
+        """
+        Validate the combined analysis JSON and normalize it to the same
+        shapes the separate calls return
+        """
+        text = (raw_response or '').strip()
+        
+        # Strip a markdown code fence if the model added one
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else ''
+            text = text.rsplit('```', 1)[0]
+        
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError('Combined analysis is not a JSON object')
+        
+        explanation = data.get('explanation')
+        health_tips = data.get('health_tips')
+        key_findings = data.get('key_findings')
+        
+        if isinstance(health_tips, list):
+            health_tips = '\n'.join(str(tip) for tip in health_tips)
+        if isinstance(key_findings, str):
+            key_findings = key_findings.split('\n')
+        
+        if not isinstance(explanation, str) or not explanation.strip():
+            raise ValueError('Combined analysis is missing the explanation')
+        if not isinstance(health_tips, str) or not health_tips.strip():
+            raise ValueError('Combined analysis is missing the health tips')
+        if not isinstance(key_findings, list):
+            raise ValueError('Combined analysis is missing the key findings')
+        
+        return {
+            'explanation': explanation.strip(),
+            'health_tips': health_tips.strip(),
+            'key_findings': [str(finding).strip('- ').strip() for finding in key_findings if str(finding).strip()]
+        }
@@ -0,0 +1,18 @@
+from sqlalchemy import event
+from src.models.user import User
+from src.services.ttl_cache import TTLCache
+from src.config import Config
+
+# Column values of authenticated users, by user id
+user_cache = TTLCache(Config.AUTH_USER_CACHE_MAX_ENTRIES, Config.AUTH_USER_CACHE_TTL)
+
+# User id of each verified token, until the token expires
+token_cache = TTLCache(Config.AUTH_TOKEN_CACHE_MAX_ENTRIES, Config.JWT_ACCESS_TOKEN_EXPIRES)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    """
+    Drop a user from the cache whenever their row is written
+    """
+    user_cache.invalidate(target.id)
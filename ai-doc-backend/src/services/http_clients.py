@@ -0,0 +1,109 @@
+import threading
+import httpx
+from src.config import Config
+
+class PooledTransport(httpx.HTTPTransport):
+    """
+    Keep-alive HTTP transport that counts requests served on new versus
+    reused connections, and requests that had to wait for a free connection
+    """
+
+    def __init__(self, max_connections, max_keepalive_connections, keepalive_expiry, proxy=None):
+        super().__init__(limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ), proxy=proxy)
+        self.max_connections = max_connections
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.waited = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            if self.in_flight > self.max_connections:
+                self.waited += 1
+
+        # httpcore reports a TCP connect only when no pooled connection was free
+        connected = []
+        previous_trace = request.extensions.get('trace')
+
+        def trace(event_name, info):
+            if event_name.endswith('connect_tcp.complete'):
+                connected.append(True)
+            if previous_trace:
+                previous_trace(event_name, info)
+
+        request.extensions = {**request.extensions, 'trace': trace}
+
+        try:
+            return super().handle_request(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                if connected:
+                    self.new_connections += 1
+                else:
+                    self.reused_connections += 1
+
+    def stats(self):
+        pool = getattr(self, '_pool', None)
+        connections = getattr(pool, 'connections', [])
+
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'inFlight': self.in_flight,
+                'connectionsOpen': len(connections),
+                'connectionsIdle': sum(1 for connection in connections if connection.is_idle()),
+                'newConnections': self.new_connections,
+                'reusedConnections': self.reused_connections,
+                'waited': self.waited,
+                'maxConnections': self.max_connections
+            }
+
+# One long-lived client per upstream, shared by every request and thread
+_clients = {}
+_transports = {}
+_clients_lock = threading.Lock()
+
+def get_http_client(name, timeout):
+    """
+    Return the shared keep-alive client for an upstream (e.g. 'openai',
+    'translation'), creating it on first use
+    """
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            # httpx ignores HTTP(S)_PROXY once a transport is passed in,
+            # so the proxy goes on the transport itself
+            transport = PooledTransport(
+                Config.HTTP_POOL_MAX_CONNECTIONS,
+                Config.HTTP_POOL_MAX_KEEPALIVE,
+                Config.HTTP_KEEPALIVE_EXPIRY,
+                proxy=Config.HTTP_PROXY
+            )
+            client = httpx.Client(
+                transport=transport,
+                timeout=httpx.Timeout(timeout, connect=Config.HTTP_CONNECT_TIMEOUT)
+            )
+            _clients[name] = client
+            _transports[name] = transport
+        return client
+
+def get_pool_stats():
+    """
+    Connection pool statistics for every shared client
+    """
+    with _clients_lock:
+        transports = dict(_transports)
+
+    return {
+        name: transport.stats()
+        for name, transport in transports.items()
+    }
@@ -0,0 +1,203 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from src.models.user import db
+from src.models.report import Report
+from src.models.job import Job
+from src.config import Config
+
+class JobQueue:
+    """
+    Background job queue persisted in the application database.
+
+    Jobs are rows in the `jobs` table, so anything queued survives a restart.
+    Each process runs a small pool of worker threads; a job is claimed with a
+    conditional UPDATE, which lets several processes (e.g. `python src/worker.py`
+    next to the web server) share the same queue without running a job twice.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.handlers = {}
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def handler(self, kind):
+        """
+        Decorator registering the function that runs jobs of the given kind.
+        Handlers are called as handler(job, progress) inside an app context.
+        """
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    def enqueue(self, kind, payload=None, report_id=None):
+        """
+        Persist a new job and wake up an idle worker
+        """
+        job = Job(
+            kind=kind,
+            report_id=report_id,
+            payload=json.dumps(payload or {}),
+            status='queued',
+            stage='queued'
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._wakeup.set()
+        return job
+
+    def start(self, app, workers=None):
+        """
+        Start the worker threads for this process (idempotent)
+        """
+        with self._lock:
+            if self._threads:
+                return
+
+            self.app = app
+            self._stopping.clear()
+            worker_count = workers if workers is not None else Config.JOB_WORKERS
+
+            for i in range(max(worker_count, 0)):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"job-worker-{i + 1}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Ask the workers to exit after their current job
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def join(self):
+        """
+        Block until the workers exit (used by the standalone worker process)
+        """
+        for thread in list(self._threads):
+            while thread.is_alive():
+                thread.join(1)
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job_id = None
+
+            with self.app.app_context():
+                try:
+                    job_id = self._claim_next_job()
+                    if job_id:
+                        self._run_job(job_id)
+                except Exception as e:
+                    print(f"Job worker error: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+            if not job_id:
+                self._wakeup.wait(Config.JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def _claim_next_job(self):
+        """
+        Claim the oldest runnable job. Jobs left 'running' by a worker that
+        stopped heartbeating (e.g. the process was restarted) are picked up
+        again until they run out of attempts.
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=Config.JOB_LEASE_SECONDS)
+
+        candidate = Job.query.filter(
+            or_(
+                Job.status == 'queued',
+                and_(Job.status == 'running', Job.locked_at < stale_before)
+            )
+        ).order_by(Job.id.asc()).first()
+
+        if not candidate:
+            return None
+
+        if candidate.attempts >= Config.JOB_MAX_ATTEMPTS:
+            self._fail_job(candidate, 'Job exceeded the maximum number of attempts')
+            return None
+
+        claimed = Job.query.filter(
+            Job.id == candidate.id,
+            Job.status == candidate.status,
+            Job.attempts == candidate.attempts
+        ).update({
+            'status': 'running',
+            'attempts': candidate.attempts + 1,
+            'locked_at': now,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+
+        # Another worker got there first
+        if not claimed:
+            return None
+
+        return candidate.id
+
+    def _run_job(self, job_id):
+        job = Job.query.get(job_id)
+        if not job:
+            return
+
+        handler = self.handlers.get(job.kind)
+        if not handler:
+            self._fail_job(job, f"No handler registered for job kind: {job.kind}")
+            return
+
+        def progress(stage, percent=None):
+            job.stage = stage
+            if percent is not None:
+                job.progress = percent
+            job.locked_at = datetime.utcnow()
+            db.session.commit()
+
+        try:
+            handler(job, progress)
+
+            job.status = 'completed'
+            job.stage = 'completed'
+            job.progress = 100
+            job.error = None
+            job.locked_at = None
+            db.session.commit()
+        except Exception as e:
+            print(f"Job {job_id} ({job.kind}) failed: {e}")
+            db.session.rollback()
+            self._fail_job(job, str(e))
+
+    def _fail_job(self, job, error):
+        try:
+            job.status = 'failed'
+            job.error = error
+            job.locked_at = None
+
+            if job.report_id:
+                report = Report.query.get(job.report_id)
+                if report:
+                    report.status = 'failed'
+
+            db.session.commit()
+        except Exception as e:
+            # The job row may be gone if its report was deleted meanwhile
+            print(f"Could not mark job as failed: {e}")
+            db.session.rollback()
+
+# Shared queue instance for the application
+job_queue = JobQueue()
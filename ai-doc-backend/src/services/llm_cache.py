@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from src.services.ttl_cache import TTLCache
+from src.config import Config
+
+class LLMCache:
+    """
+    Base class for LLM response caches. Keys are derived from the model,
+    sampling parameters and the whitespace-normalized prompt; entries
+    expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, model, temperature, max_tokens, messages):
+        normalized = [
+            [message['role'], ' '.join(message['content'].split())]
+            for message in messages
+        ]
+        raw_key = json.dumps([model, temperature, max_tokens, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+
+        lookups = hits + misses
+        return {
+            'backend': self.backend,
+            'hits': hits,
+            'misses': misses,
+            'hitRate': hits / lookups if lookups else 0.0,
+            'entries': self._count(),
+            'maxEntries': self.max_entries,
+            'ttl': self.ttl
+        }
+
+class MemoryLLMCache(LLMCache):
+    """
+    In-process LRU cache, private to each worker process
+    """
+    backend = 'memory'
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(max_entries, ttl)
+        self._entries = TTLCache(max_entries, ttl)
+
+    def _get(self, key):
+        return self._entries.get(key)
+
+    def _set(self, key, value):
+        self._entries.set(key, value)
+
+    def _count(self):
+        return len(self._entries)
+
+class SQLiteLLMCache(LLMCache):
+    """
+    Cache stored in its own SQLite file, shared by every process on the host
+    """
+    backend = 'sqlite'
+
+    def __init__(self, path, max_entries, ttl):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS llm_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key):
+        now = time.time()
+        try:
+            with closing(self._connect()) as connection, connection:
+                row = connection.execute(
+                    'SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row[1] < now:
+                    connection.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                    return None
+
+                connection.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+
+    def _set(self, key, value):
+        now = time.time()
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                    (key, value, now + self.ttl, now)
+                )
+                connection.execute('DELETE FROM llm_cache WHERE expires_at < ?', (now,))
+                connection.execute(
+                    'DELETE FROM llm_cache WHERE key IN ('
+                    'SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
+    def _count(self):
+        try:
+            with closing(self._connect()) as connection, connection:
+                return connection.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+def create_llm_cache():
+    """
+    Build the cache selected by LLM_CACHE_BACKEND (memory, sqlite or none)
+    """
+    backend = Config.LLM_CACHE_BACKEND.lower()
+    if backend == 'memory':
+        return MemoryLLMCache(Config.LLM_CACHE_MAX_ENTRIES, Config.LLM_CACHE_TTL)
+    if backend == 'sqlite':
+        return SQLiteLLMCache(Config.LLM_CACHE_PATH, Config.LLM_CACHE_MAX_ENTRIES, Config.LLM_CACHE_TTL)
+    return None
+
+# Shared cache instance for the application (None when caching is off)
+llm_cache = create_llm_cache()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+import threading
+from src.config import Config
+
+class OCRCache:
+    """
+    On-disk cache of extracted text keyed by (content hash, file type, dpi,
+    OCR language). Entries are plain text files; reading one refreshes its
+    mtime, and the least recently used entries are evicted once the cache
+    grows past OCR_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or Config.OCR_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.OCR_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, content_hash, file_type):
+        """
+        Cache key for a file's content and the OCR settings that shape its text
+        """
+        raw_key = f"{content_hash}:{file_type.lower()}:{Config.OCR_DPI}:{Config.OCR_LANGUAGE}"
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                text = file.read()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def set(self, key, text):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Write to a temp file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(temp_path, self._path(key))
+
+            self._evict()
+        except OSError as e:
+            print(f"Could not write OCR cache entry: {e}")
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+
+        entries, size = 0, 0
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.txt'):
+                    entries += 1
+                    size += entry.stat().st_size
+
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRate': hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'sizeBytes': size,
+            'maxBytes': self.max_bytes
+        }
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes
+        """
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.txt'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+                total_size -= size
+            except OSError:
+                pass
+            if total_size <= self.max_bytes:
+                break
+
+# Shared cache instance for the application
+ocr_cache = OCRCache()
@@ -1,32 +1,183 @@
-import os
+import io
+import re
+import subprocess
+import threading
+import multiprocessing
 import pytesseract
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
-from pdf2image import convert_from_path
-import tempfile
+from pdf2image import convert_from_path, pdfinfo_from_path
 from src.config import Config
+from src.services.ocr_cache import ocr_cache
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Warm tesserocr engines, one per thread (and therefore one per pool process)
+_engines = threading.local()
+
+def _get_tesserocr_engine():
+    """
+    Return this thread's tesserocr engine, loading the language data only
+    the first time the thread needs it
+    """
+    engine = getattr(_engines, 'api', None)
+    if engine is None:
+        if Config.TESSDATA_PATH:
+            engine = tesserocr.PyTessBaseAPI(path=Config.TESSDATA_PATH, lang=Config.OCR_LANGUAGE)
+        else:
+            engine = tesserocr.PyTessBaseAPI(lang=Config.OCR_LANGUAGE)
+        _engines.api = engine
+    return engine
+
+# Process pool shared by all OCRService instances for per-page PDF OCR
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=Config.OCR_WORKERS, mp_context=_get_mp_context())
+        return _process_pool
+
+def _get_mp_context():
+    """
+    Start pool workers from a clean process rather than forking this
+    multi-threaded one, where a lock held by another thread (stdout,
+    logging, the allocator) would stay locked forever in the child
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+
+    context = multiprocessing.get_context('forkserver')
+    # The fork server imports the OCR dependencies once for every worker it
+    # starts, but not the entry point, which isn't needed to OCR a page
+    context.set_forkserver_preload([__name__])
+    return context
+
+def shutdown_process_pool():
+    """
+    Shut down the shared OCR process pool (it is recreated on next use)
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+
+def _ocr_pdf_page(pdf_path, page_number):
+    """
+    Render and OCR a single PDF page inside a pool worker. Only the path and
+    page number cross the process boundary, never the rendered image.
+    Returns the text and the number of pixels rendered.
+    """
+    service = OCRService()
+    images = convert_from_path(pdf_path, dpi=Config.OCR_DPI, first_page=page_number, last_page=page_number)
+    if not images:
+        return "", 0
+    
+    image = images[0]
+    return service.extract_text_from_image(image), image.width * image.height
 
 class OCRService:
     def __init__(self):
         # Set tesseract command path
         if Config.TESSERACT_CMD:
             pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+        
+        # OCR backend: warm tesserocr engines, or a tesseract process per image
+        self.backend = Config.OCR_BACKEND
+        if self.backend == 'tesserocr' and tesserocr is None:
+            print("tesserocr is not installed, falling back to pytesseract")
+            self.backend = 'pytesseract'
     
-    def extract_text_from_file(self, file_path, file_type):
+    def extract_text_from_file(self, file_path, file_type, content_hash=None):
         """
-        Extract text from various file types
+        Extract text from various file types. When the SHA-256 of the file
+        is given, previously extracted text for the same bytes is reused.
         """
+        cache_key = None
+        if content_hash and Config.OCR_CACHE_ENABLED and file_type.lower() != 'txt':
+            cache_key = ocr_cache.make_key(content_hash, file_type)
+            cached_text = ocr_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        
         try:
             if file_type.lower() == 'pdf':
-                return self._extract_text_from_pdf(file_path)
+                text = self._extract_text_from_pdf(file_path)
             elif file_type.lower() in ['png', 'jpg', 'jpeg']:
-                return self._extract_text_from_image(file_path)
+                text = self._extract_text_from_image(file_path)
             elif file_type.lower() == 'txt':
-                return self._extract_text_from_txt(file_path)
+                text = self._extract_text_from_txt(file_path)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
         except Exception as e:
             print(f"Error extracting text from {file_path}: {e}")
             return ""
+        
+        # Only successful extractions are worth remembering
+        if cache_key and text.strip():
+            ocr_cache.set(cache_key, text)
+        
+        return text
+    
+    def extract_text_from_image(self, image):
+        """
+        Extract text from an in-memory image: a PIL image, raw encoded bytes
+        or a file-like object. The pixels are handed to Tesseract as-is,
+        without a PNG encode/decode round trip.
+        """
+        try:
+            image = self._load_image(image)
+            
+            return self._run_ocr(image).strip()
+        except Exception as e:
+            print(f"Error in OCR for in-memory image: {e}")
+            return ""
+    
+    def _run_ocr(self, image):
+        """
+        Run the configured OCR backend on a loaded image
+        """
+        if self.backend == 'tesserocr':
+            try:
+                engine = _get_tesserocr_engine()
+                engine.SetImage(image)
+                return engine.GetUTF8Text()
+            except Exception as e:
+                print(f"tesserocr failed, falling back to pytesseract: {e}")
+        
+        # pytesseract re-encodes images without a format as PNG; PPM is
+        # an uncompressed dump of the pixels and is much cheaper to write.
+        # The caller's image gets its own format back afterwards.
+        original_format = image.format
+        image.format = 'PPM'
+        try:
+            # Extract text using Tesseract
+            return pytesseract.image_to_string(image, lang=Config.OCR_LANGUAGE)
+        finally:
+            image.format = original_format
+    
+    def _load_image(self, image):
+        """
+        Open raw bytes or file-like objects and normalize the image mode
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            image = Image.open(io.BytesIO(image))
+        elif not isinstance(image, Image.Image):
+            image = Image.open(image)
+        
+        # Convert to RGB if necessary
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        
+        return image
     
     def _extract_text_from_image(self, image_path):
         """
@@ -36,45 +187,241 @@ class OCRService:
             # Open image
             image = Image.open(image_path)
             
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Extract text using Tesseract
-            text = pytesseract.image_to_string(image, lang='eng')
-            
-            return text.strip()
+            return self.extract_text_from_image(image)
         except Exception as e:
             print(f"Error in OCR for image {image_path}: {e}")
             return ""
     
     def _extract_text_from_pdf(self, pdf_path):
         """
-        Extract text from PDF by converting to images and using OCR
+        Extract text from PDF, using the embedded text layer where a page has
+        one and converting the remaining pages to images for OCR
         """
         try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=300)
-            
-            extracted_text = ""
-            
-            for i, image in enumerate(images):
-                # Save image to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                    image.save(temp_file.name, 'PNG')
-                    
-                    # Extract text from image
-                    page_text = self._extract_text_from_image(temp_file.name)
-                    extracted_text += f"\n--- Page {i+1} ---\n{page_text}\n"
-                    
-                    # Clean up temporary file
-                    os.unlink(temp_file.name)
-            
-            return extracted_text.strip()
+            info = pdfinfo_from_path(pdf_path)
+            page_count = info.get('Pages', 0)
+            
+            # The text layer is cheap to read, so every page gets it
+            page_texts = {}
+            if Config.PDF_TEXT_LAYER_ENABLED:
+                scanned_pages = self._find_scanned_pages(pdf_path, info.get('Page size'))
+                page_texts = self._extract_pdf_text_layer(pdf_path, page_count, scanned_pages)
+            
+            # Only scanned / image-only pages go through OCR, within the page and pixel caps
+            ocr_pages = [n for n in range(1, page_count + 1) if n not in page_texts]
+            ocr_pages = self._limit_ocr_pages(pdf_path, ocr_pages, info.get('Page size'))
+            if ocr_pages:
+                page_texts.update(self._ocr_pdf_pages(pdf_path, ocr_pages))
+            
+            return self._join_page_texts(page_texts)
         except Exception as e:
             print(f"Error in PDF OCR for {pdf_path}: {e}")
             return ""
     
+    def _extract_pdf_text_layer(self, pdf_path, page_count, scanned_pages=()):
+        """
+        Read the embedded text of each page with poppler's pdftotext and keep
+        the pages with enough real text to skip OCR. Scanned pages need much
+        more, so a fax header or lab stamp over a scan doesn't hide its body.
+        """
+        try:
+            result = subprocess.run(
+                ['pdftotext', '-layout', '-enc', 'UTF-8', '-l', str(page_count), pdf_path, '-'],
+                capture_output=True,
+                timeout=60,
+                check=True
+            )
+        except Exception as e:
+            print(f"Could not read text layer of {pdf_path}, using OCR: {e}")
+            return {}
+        
+        # pdftotext ends every page with a form feed
+        pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+        
+        page_texts = {}
+        for i, page_text in enumerate(pages[:page_count]):
+            min_chars = Config.PDF_SCANNED_TEXT_MIN_CHARS if i + 1 in scanned_pages else Config.PDF_TEXT_MIN_CHARS
+            if sum(c.isalnum() for c in page_text) >= min_chars:
+                page_texts[i + 1] = page_text.strip()
+        
+        return page_texts
+    
+    def _find_scanned_pages(self, pdf_path, page_size):
+        """
+        Pages mostly covered by images, according to poppler's pdfimages.
+        Page sizes are taken from pdfinfo's size of the first page.
+        """
+        try:
+            result = subprocess.run(
+                ['pdfimages', '-list', pdf_path],
+                capture_output=True,
+                timeout=60,
+                check=True
+            )
+        except Exception as e:
+            print(f"Could not list images of {pdf_path}: {e}")
+            return set()
+        
+        page_width, page_height = self._parse_page_size(page_size) or (612, 792)
+        
+        # page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+        coverage = {}
+        for line in result.stdout.decode('utf-8', errors='replace').splitlines()[2:]:
+            fields = line.split()
+            if len(fields) < 14 or fields[2] != 'image':
+                continue
+            try:
+                page = int(fields[0])
+                width = int(fields[3]) / float(fields[12]) * 72
+                height = int(fields[4]) / float(fields[13]) * 72
+            except (ValueError, ZeroDivisionError):
+                continue
+            coverage[page] = coverage.get(page, 0) + width * height / (page_width * page_height)
+        
+        return {page for page, share in coverage.items() if share >= Config.PDF_SCAN_MIN_COVERAGE}
+    
+    def _ocr_pdf_pages(self, pdf_path, page_numbers):
+        """
+        OCR the given PDF pages, concurrently when there is more than one
+        """
+        if Config.OCR_PARALLEL_PAGES and Config.OCR_WORKERS > 1 and len(page_numbers) > 1:
+            try:
+                return self._ocr_pdf_pages_parallel(pdf_path, page_numbers)
+            except BrokenProcessPool as e:
+                print(f"OCR process pool failed for {pdf_path}, retrying sequentially: {e}")
+                shutdown_process_pool()
+        
+        return self._ocr_pdf_pages_streaming(pdf_path, page_numbers)
+    
+    def _ocr_pdf_pages_streaming(self, pdf_path, page_numbers):
+        """
+        Render and OCR the PDF a few pages at a time so peak memory depends on
+        OCR_PAGE_WINDOW rather than on the number of pages
+        """
+        page_texts = {}
+        rendered_pixels = 0
+        
+        for window in self._page_windows(page_numbers, max(Config.OCR_PAGE_WINDOW, 1)):
+            images = convert_from_path(
+                pdf_path,
+                dpi=Config.OCR_DPI,
+                first_page=window[0],
+                last_page=window[-1]
+            )
+            
+            # Each page is OCRed straight from memory and released right after
+            for page_number, image in zip(window, images):
+                rendered_pixels += image.width * image.height
+                if rendered_pixels <= Config.OCR_MAX_PIXELS:
+                    page_texts[page_number] = self.extract_text_from_image(image)
+                image.close()
+            
+            del images
+            
+            if rendered_pixels > Config.OCR_MAX_PIXELS:
+                print(f"Pixel limit reached for {pdf_path}, stopping after {len(page_texts)} OCR pages")
+                break
+        
+        return page_texts
+    
+    def _ocr_pdf_pages_parallel(self, pdf_path, page_numbers):
+        """
+        OCR PDF pages in the shared process pool, at most OCR_WORKERS pages
+        in flight. Rendered pixels are counted in page order against
+        OCR_MAX_PIXELS, as in the streaming path, and no more pages are
+        started once the budget is spent.
+        """
+        pool = _get_process_pool()
+        pages = iter(page_numbers)
+        pending = deque()
+        
+        def submit_next():
+            page_number = next(pages, None)
+            if page_number is not None:
+                pending.append((page_number, pool.submit(_ocr_pdf_page, pdf_path, page_number)))
+        
+        for _ in range(Config.OCR_WORKERS):
+            submit_next()
+        
+        page_texts = {}
+        rendered_pixels = 0
+        while pending:
+            page_number, future = pending.popleft()
+            text, pixels = future.result()
+            
+            rendered_pixels += pixels
+            if rendered_pixels > Config.OCR_MAX_PIXELS:
+                for _, queued in pending:
+                    queued.cancel()
+                print(f"Pixel limit reached for {pdf_path}, stopping after {len(page_texts)} OCR pages")
+                break
+            
+            page_texts[page_number] = text
+            submit_next()
+        
+        return page_texts
+    
+    def _page_windows(self, page_numbers, size):
+        """
+        Split sorted page numbers into runs of consecutive pages of at most
+        `size` pages, each of which can be rendered with one first/last call
+        """
+        windows = []
+        for page_number in page_numbers:
+            if windows and len(windows[-1]) < size and windows[-1][-1] == page_number - 1:
+                windows[-1].append(page_number)
+            else:
+                windows.append([page_number])
+        return windows
+    
+    def _limit_ocr_pages(self, pdf_path, ocr_pages, page_size):
+        """
+        The first of the pages needing OCR, capped by OCR_MAX_PAGES and by
+        the OCR_MAX_PIXELS budget estimated from the page size at OCR_DPI
+        """
+        limit = min(len(ocr_pages), Config.OCR_MAX_PAGES)
+        
+        page_pixels = self._estimate_page_pixels(page_size)
+        if page_pixels:
+            limit = min(limit, Config.OCR_MAX_PIXELS // page_pixels)
+        
+        if limit < len(ocr_pages):
+            print(f"Only running OCR on {limit} of {len(ocr_pages)} scanned pages of {pdf_path}")
+        
+        return ocr_pages[:limit]
+    
+    def _estimate_page_pixels(self, page_size):
+        """
+        Pixels of one page rendered at OCR_DPI, from pdfinfo's "612 x 792 pts" size
+        """
+        size = self._parse_page_size(page_size)
+        if not size:
+            return None
+        
+        width = size[0] / 72 * Config.OCR_DPI
+        height = size[1] / 72 * Config.OCR_DPI
+        return int(width * height)
+    
+    def _parse_page_size(self, page_size):
+        """
+        (width, height) in points from pdfinfo's "612 x 792 pts" size
+        """
+        match = re.match(r'([\d.]+) x ([\d.]+) pts', page_size or '')
+        if not match:
+            return None
+        return float(match.group(1)), float(match.group(2))
+    
+    def _join_page_texts(self, page_texts):
+        """
+        Combine per-page text, keyed by page number, with "--- Page N ---" markers
+        """
+        extracted_text = ""
+        
+        for page_number in sorted(page_texts):
+            extracted_text += f"\n--- Page {page_number} ---\n{page_texts[page_number]}\n"
+        
+        return extracted_text.strip()
+    
     def _extract_text_from_txt(self, txt_path):
         """
         Extract text from plain text file
@@ -0,0 +1,166 @@
+import re
+import threading
+from src.config import Config
+
+# tiktoken gives exact counts; without it token counts are estimated
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Report sections are pages and paragraphs, cut down to about this many characters
+SECTION_MAX_CHARS = 1500
+
+PAGE_MARKER_PATTERN = re.compile(r'--- Page \d+ ---')
+SECTION_OMITTED = '[...]'
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def count_tokens(text, model):
+    """
+    Number of tokens `text` takes for `model`
+    """
+    if not text:
+        return 0
+
+    if tiktoken is not None:
+        with _encodings_lock:
+            encoding = _encodings.get(model)
+            if encoding is None:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding('cl100k_base')
+                _encodings[model] = encoding
+        return len(encoding.encode(text))
+
+    # Roughly four ASCII characters per token; other scripts take about
+    # one token per character, so count those one for one to stay on the safe side
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+def get_prompt_budget(model):
+    """
+    Prompt token budget configured for a model
+    """
+    return Config.AI_PROMPT_TOKEN_BUDGETS.get(model, Config.AI_DEFAULT_PROMPT_TOKEN_BUDGET)
+
+class PromptBudget:
+    """
+    Token allowance for one prompt. Parts are added in priority order and
+    refused once they no longer fit.
+    """
+
+    def __init__(self, model, budget=None):
+        self.model = model
+        self.budget = budget or get_prompt_budget(model)
+        self.used = 0
+        self.trimmed = False
+
+    def add(self, text, overhead=0, force=False):
+        """
+        Count `text` against the budget if it fits (or `force` is set) and
+        return whether it was taken
+        """
+        tokens = count_tokens(text, self.model) + overhead
+        if not force and self.used + tokens > self.budget:
+            self.trimmed = True
+            return False
+
+        self.used += tokens
+        return True
+
+def split_report_sections(report_content, max_chars=SECTION_MAX_CHARS):
+    """
+    Split a report into sections: pages, then paragraphs, with long
+    paragraphs cut on line boundaries into pieces of about `max_chars`
+    """
+    if not report_content:
+        return []
+
+    sections = []
+    for page in PAGE_MARKER_PATTERN.split(report_content):
+        for paragraph in re.split(r'\n\s*\n', page):
+            current = ''
+            for line in paragraph.strip().splitlines():
+                if current and len(current) + len(line) > max_chars:
+                    sections.append(current)
+                    current = ''
+                current = f"{current}\n{line}" if current else line
+            if current.strip():
+                sections.append(current)
+
+    return sections
+
+def rank_sections(sections, question):
+    """
+    Section indexes ordered by how many of the question's words they
+    contain, earlier sections first among equals
+    """
+    terms = {term for term in re.findall(r'\w+', question.lower()) if len(term) > 2}
+
+    def score(index):
+        words = set(re.findall(r'\w+', sections[index].lower()))
+        return (-len(terms & words), index)
+
+    return sorted(range(len(sections)), key=score)
+
+def join_sections(sections, chosen):
+    """
+    Join the chosen sections ({position: text}) in report order, marking
+    the gaps left by omitted ones
+    """
+    parts = []
+    previous = -1
+    for position in sorted(chosen):
+        if position != previous + 1:
+            parts.append(SECTION_OMITTED)
+        parts.append(sections[position])
+        previous = position
+
+    if sections and previous < max(sections):
+        parts.append(SECTION_OMITTED)
+
+    return '\n\n'.join(parts)
+
+class PromptStats:
+    """
+    Size of the prompts sent to each model, to watch cost and context use
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, tokens, budget, trimmed):
+        with self._lock:
+            entry = self._models.setdefault(model, {
+                'requests': 0,
+                'totalTokens': 0,
+                'maxTokens': 0,
+                'trimmedRequests': 0
+            })
+            entry['requests'] += 1
+            entry['totalTokens'] += tokens
+            entry['maxTokens'] = max(entry['maxTokens'], tokens)
+            entry['lastTokens'] = tokens
+            entry['budget'] = budget
+            if trimmed:
+                entry['trimmedRequests'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: {
+                    **entry,
+                    'averageTokens': entry['totalTokens'] / entry['requests']
+                }
+                for model, entry in self._models.items()
+            }
+
+# Shared prompt size statistics for the application
+prompt_stats = PromptStats()
@@ -0,0 +1,308 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.config import Config
+
+class ProviderSkipped(Exception):
+    """
+    Raised by a provider call that doesn't apply to the request (e.g. an
+    unsupported language); it doesn't count against the provider's health
+    """
+
+class ProviderUnavailable(Exception):
+    """
+    Raised when no provider returned a result
+    """
+
+class CircuitBreaker:
+    """
+    Rolling health of one upstream provider. The circuit opens once the
+    error rate over the last `window` calls reaches `error_threshold`,
+    stays open for `cooldown` seconds, then lets one trial call through
+    (half-open) whose outcome closes or re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window, min_calls, error_threshold, cooldown):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.calls = deque(maxlen=window)  # (ok, latency) of recent calls
+        self.total_calls = 0
+        self.total_failures = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def available(self):
+        """
+        Whether a call could be made now, without claiming it
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            if self.state == self.HALF_OPEN:
+                return not self.trial_in_flight
+            return True
+
+    def acquire(self):
+        """
+        Claim the right to call the provider now; in half-open state only
+        one trial call is let through
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self.trial_in_flight:
+                    return False
+                self.trial_in_flight = True
+
+            return True
+
+    def release(self):
+        """
+        Give back a claimed call that didn't apply to the provider
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.trial_in_flight = False
+
+    def record(self, ok, latency, timed_out=False):
+        with self._lock:
+            self.calls.append((ok, latency))
+            self.total_calls += 1
+            if not ok:
+                self.total_failures += 1
+            if timed_out:
+                self.timeouts += 1
+
+            if self.state == self.HALF_OPEN:
+                self.trial_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self.calls.clear()
+                    self.calls.append((ok, latency))
+                else:
+                    self._open()
+            elif self.state == self.CLOSED and not ok:
+                failures = sum(1 for call_ok, _ in self.calls if not call_ok)
+                if len(self.calls) >= self.min_calls and failures / len(self.calls) >= self.error_threshold:
+                    self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        print(f"Circuit opened for {self.name}")
+
+    def latency_percentile(self, percentile):
+        """
+        Latency of recent successful calls at the given percentile (0-1),
+        or None without samples
+        """
+        with self._lock:
+            latencies = sorted(latency for ok, latency in self.calls if ok)
+        if not latencies:
+            return None
+        return latencies[int(percentile * (len(latencies) - 1))]
+
+    def stats(self):
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+
+        with self._lock:
+            failures = sum(1 for ok, _ in self.calls if not ok)
+            return {
+                'state': self.state,
+                'recentCalls': len(self.calls),
+                'errorRate': failures / len(self.calls) if self.calls else 0.0,
+                'latencyP50Ms': round(p50 * 1000) if p50 is not None else None,
+                'latencyP95Ms': round(p95 * 1000) if p95 is not None else None,
+                'totalCalls': self.total_calls,
+                'totalFailures': self.total_failures,
+                'timeouts': self.timeouts
+            }
+
+class _Attempt:
+    """
+    One provider call; its outcome is recorded exactly once, whether it
+    finishes, fails or is abandoned at its deadline. The deadline runs from
+    when the call starts; while it waits for a pool thread the same amount
+    of time is allowed from submission.
+    """
+
+    def __init__(self, breaker, timeout):
+        self.breaker = breaker
+        self.timeout = timeout
+        self.submitted = time.monotonic()
+        self.started = None
+        self._settled = False
+        self._lock = threading.Lock()
+
+    @property
+    def deadline(self):
+        return (self.started or self.submitted) + self.timeout
+
+    def run(self, call):
+        self.started = time.monotonic()
+        try:
+            result = call()
+        except ProviderSkipped:
+            self._settle(skipped=True)
+            raise
+        except Exception:
+            self._settle(ok=False)
+            raise
+        self._settle(ok=True)
+        return result
+
+    def expire(self):
+        self._settle(ok=False, timed_out=True)
+
+    def withdraw(self):
+        """
+        Give up on an attempt that never started; the provider isn't blamed
+        """
+        self._settle(skipped=True)
+
+    def _settle(self, ok=False, timed_out=False, skipped=False):
+        with self._lock:
+            if self._settled:
+                return
+            self._settled = True
+
+        if skipped:
+            self.breaker.release()
+        else:
+            self.breaker.record(ok, time.monotonic() - (self.started or self.submitted), timed_out)
+
+class ProviderRouter:
+    """
+    Calls interchangeable upstream providers in priority order. Providers
+    with an open circuit are skipped and slow ones are tried after the
+    others; every call has a hard deadline, and with a hedge delay the
+    next provider is started in parallel when the current one is slow.
+    """
+
+    def __init__(self, deadline, hedge_delay, slow_latency):
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.slow_latency = slow_latency
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=Config.HTTP_POOL_MAX_CONNECTIONS,
+            thread_name_prefix='provider'
+        )
+
+    def breaker(self, provider):
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    Config.CIRCUIT_WINDOW,
+                    Config.CIRCUIT_MIN_CALLS,
+                    Config.CIRCUIT_ERROR_THRESHOLD,
+                    Config.CIRCUIT_COOLDOWN
+                )
+                self._breakers[provider] = breaker
+            return breaker
+
+    def _is_slow(self, provider):
+        p50 = self.breaker(provider).latency_percentile(0.5)
+        return p50 is not None and p50 > self.slow_latency
+
+    def call(self, operation, calls):
+        """
+        Run `calls`, a list of (provider, callable) in priority order, and
+        return (result, provider) from the first that succeeds.
+        Raises ProviderUnavailable when none does.
+        """
+        candidates = [(provider, call) for provider, call in calls if self.breaker(provider).available()]
+        candidates.sort(key=lambda candidate: self._is_slow(candidate[0]))  # stable: keeps priority
+        candidates = iter(candidates)
+        pending = {}
+
+        def start_next():
+            for provider, call in candidates:
+                breaker = self.breaker(provider)
+                if not breaker.acquire():
+                    continue
+                attempt = _Attempt(breaker, self.deadline)
+                pending[self._pool.submit(attempt.run, call)] = (provider, attempt)
+                return True
+            return False
+
+        start_next()
+        hedge_at = time.monotonic() + self.hedge_delay if self.hedge_delay > 0 else None
+
+        while pending:
+            wake_at = min(attempt.deadline for _, attempt in pending.values())
+            if hedge_at is not None:
+                wake_at = min(wake_at, hedge_at)
+
+            done, _ = wait(pending, timeout=max(0, wake_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    return future.result(), provider
+                except Exception as e:
+                    print(f"{provider} {operation} failed: {e}")
+
+            # Abandon calls past their deadline; the thread finishes in the background.
+            # Calls still waiting for a thread are withdrawn without counting against
+            # the provider, or left waiting when there is no other provider to try
+            now = time.monotonic()
+            for future, (provider, attempt) in list(pending.items()):
+                if now < attempt.deadline:
+                    continue
+                if attempt.started is None and not start_next():
+                    attempt.submitted = now
+                    continue
+                if future.cancel():
+                    attempt.withdraw()
+                    print(f"{provider} {operation} waited {self.deadline}s for a free thread")
+                    del pending[future]
+                    continue
+                if attempt.started is None:
+                    # A thread picked it up before run() could record the start
+                    attempt.started = now
+                if now < attempt.deadline:
+                    continue  # started just now
+                attempt.expire()
+                print(f"{provider} {operation} exceeded its {self.deadline}s deadline")
+                del pending[future]
+
+            # Fall over when nothing is in flight, or hedge when the current call is slow
+            if not pending or (hedge_at is not None and now >= hedge_at):
+                started = start_next()
+                hedge_at = now + self.hedge_delay if started and self.hedge_delay > 0 else None
+
+        raise ProviderUnavailable(f"No provider could {operation}")
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+
+        return {
+            provider: {**breaker.stats(), 'slow': self._is_slow(provider)}
+            for provider, breaker in breakers.items()
+        }
+
+# Shared router for the translation providers
+provider_router = ProviderRouter(
+    Config.TRANSLATION_CALL_DEADLINE,
+    Config.TRANSLATION_HEDGE_DELAY,
+    Config.TRANSLATION_SLOW_LATENCY
+)
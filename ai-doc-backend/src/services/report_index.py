@@ -0,0 +1,116 @@
+import math
+import re
+from collections import Counter
+from sqlalchemy import func
+from src.models.user import db
+from src.models.report_index import ReportPassage, ReportPassageTerm
+from src.services.prompt_budget import split_report_sections
+from src.config import Config
+
+# Words, including the vowel signs and viramas of Indic scripts that \w leaves out
+TOKEN_PATTERN = re.compile(r'[\w\u0900-\u0dff]+')
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text):
+    """
+    Lower-cased index terms of a text
+    """
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if 1 < len(term) <= 100]
+
+def delete_report_index(report_id):
+    """
+    Remove a report's passages and terms. The caller commits.
+    """
+    ReportPassageTerm.query.filter_by(report_id=report_id).delete()
+    ReportPassage.query.filter_by(report_id=report_id).delete()
+
+def build_report_index(report):
+    """
+    (Re)build the passage index of a report from its current content.
+    The caller commits.
+    """
+    delete_report_index(report.id)
+
+    content = report.translated_content or report.original_content
+    passages = []
+    passage_terms = []
+    for position, text in enumerate(split_report_sections(content, Config.REPORT_PASSAGE_CHARS)):
+        terms = Counter(tokenize(text))
+        passages.append(ReportPassage(
+            report_id=report.id,
+            position=position,
+            content=text,
+            length=sum(terms.values())
+        ))
+        passage_terms.append(terms)
+
+    if not passages:
+        return
+
+    db.session.add_all(passages)
+    db.session.flush()  # assign passage ids
+
+    db.session.execute(ReportPassageTerm.__table__.insert(), [
+        {'report_id': report.id, 'passage_id': passage.id, 'term': term, 'frequency': frequency}
+        for passage, terms in zip(passages, passage_terms)
+        for term, frequency in terms.items()
+    ])
+
+def search_report(report, question, top_k=None):
+    """
+    BM25 search of a report's passages. Returns up to `top_k` (position,
+    text) pairs, most relevant first, or None when retrieval is off or no
+    passage shares a term with the question (the caller then falls back
+    to the whole report). Reports indexed before this existed are indexed
+    on first use; the caller commits.
+    """
+    top_k = Config.CHAT_RETRIEVAL_TOP_K if top_k is None else top_k
+    if top_k <= 0:
+        return None
+
+    passage_count, total_length = db.session.query(
+        func.count(ReportPassage.id), func.sum(ReportPassage.length)
+    ).filter(ReportPassage.report_id == report.id).one()
+
+    if not passage_count:
+        build_report_index(report)
+        passage_count, total_length = db.session.query(
+            func.count(ReportPassage.id), func.sum(ReportPassage.length)
+        ).filter(ReportPassage.report_id == report.id).one()
+        if not passage_count:
+            return None
+
+    terms = set(tokenize(question))
+    if not terms:
+        return None
+
+    matches = db.session.query(
+        ReportPassageTerm.passage_id, ReportPassageTerm.term, ReportPassageTerm.frequency
+    ).filter(
+        ReportPassageTerm.report_id == report.id,
+        ReportPassageTerm.term.in_(terms)
+    ).all()
+    if not matches:
+        return None
+
+    document_frequency = Counter(term for _, term, _ in matches)
+    passages = {
+        passage.id: passage
+        for passage in ReportPassage.query.filter(
+            ReportPassage.id.in_({passage_id for passage_id, _, _ in matches})
+        ).all()
+    }
+    average_length = (total_length or 0) / passage_count or 1
+
+    scores = Counter()
+    for passage_id, term, frequency in matches:
+        df = document_frequency[term]
+        idf = math.log(1 + (passage_count - df + 0.5) / (df + 0.5))
+        length_norm = 1 - BM25_B + BM25_B * passages[passage_id].length / average_length
+        scores[passage_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+
+    ranked = sorted(scores, key=lambda passage_id: (-scores[passage_id], passages[passage_id].position))
+    return [(passages[passage_id].position, passages[passage_id].content) for passage_id in ranked[:top_k]]
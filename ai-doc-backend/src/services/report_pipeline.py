@@ -0,0 +1,99 @@
+import json
+from src.models.user import db
+from src.models.report import Report
+from src.services.job_queue import job_queue
+from src.services.ocr_service import OCRService
+from src.services.translation_service import TranslationService
+from src.services.ai_service import AIService
+from src.services.report_index import build_report_index
+from src.config import Config
+
+def enqueue_report_processing(report, target_language, content_hash=None):
+    """
+    Queue the OCR -> translation -> AI analysis pipeline for a report
+    """
+    report.status = 'queued'
+    db.session.commit()
+
+    return job_queue.enqueue(
+        'process_report',
+        payload={'target_language': target_language, 'content_hash': content_hash},
+        report_id=report.id
+    )
+
+@job_queue.handler('process_report')
+def process_report(job, progress):
+    """
+    Run the full processing pipeline for an uploaded report.
+    Each stage is mirrored to report.status so clients can poll it.
+    """
+    report = Report.query.get(job.report_id)
+    if not report:
+        return
+
+    payload = job.get_payload()
+    target_language = payload.get('target_language', 'en')
+
+    def set_stage(stage, percent):
+        report.status = stage
+        progress(stage, percent)
+
+    # Extract text from file
+    set_stage('extracting', 10)
+    ocr_service = OCRService()
+    extracted_text = ocr_service.extract_text_from_file(
+        report.file_path, report.file_type, payload.get('content_hash')
+    )
+
+    if not extracted_text.strip():
+        raise ValueError('Could not extract text from file')
+
+    # Update report with extracted text
+    report.original_content = extracted_text
+
+    # Translate if needed
+    set_stage('translating', 35)
+    translation_service = TranslationService()
+    if target_language != 'en':
+        translated_text = translation_service.translate_text(
+            extracted_text, target_language, 'auto'
+        )
+        report.translated_content = translated_text
+        report.translated_language = target_language
+    else:
+        report.translated_content = extracted_text
+        report.translated_language = 'en'
+
+    # Index passages for chat retrieval
+    build_report_index(report)
+
+    # Generate AI explanation, health tips and key findings
+    set_stage('analyzing', 55)
+    ai_service = AIService()
+    content_for_analysis = report.translated_content or report.original_content
+
+    # Save each result as soon as it arrives so a slow call doesn't hold back the others
+    completed = []
+
+    def save_result(name, value):
+        if name == 'key_findings':
+            value = json.dumps(value)
+        setattr(report, name, value)
+        completed.append(name)
+        progress('analyzing', 55 + 13 * len(completed))
+
+    # Write the explanation as it grows so clients polling the report see progress
+    def save_partial(name, text):
+        setattr(report, name, text)
+        progress('analyzing')
+
+    ai_service.analyze_report(
+        content_for_analysis,
+        target_language,
+        on_result=save_result,
+        on_partial=save_partial if Config.AI_STREAM_EXPLANATION else None
+    )
+
+    # Update status
+    report.status = 'processed'
+    db.session.commit()
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from src.config import Config
+
+class TranslationMemory:
+    """
+    Persistent segment-level translation memory keyed by (normalized
+    segment, source language, target language, provider), stored in its own
+    SQLite file so every process on the host shares it. Only a hash of each
+    source segment is kept; entries expire after `ttl` seconds and the
+    oldest are dropped once there are more than `max_entries`.
+    """
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lookups = 0
+        self.hits = 0
+        self.chars_looked_up = 0
+        self.chars_saved = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            # Earlier versions also stored the source text; drop those entries
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(translation_memory)')]
+            if 'segment' in columns:
+                connection.execute('DROP TABLE translation_memory')
+
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS translation_memory ('
+                'segment_hash TEXT NOT NULL, source_language TEXT NOT NULL, '
+                'target_language TEXT NOT NULL, provider TEXT NOT NULL, '
+                'translation TEXT NOT NULL, '
+                'hits INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, '
+                'PRIMARY KEY (segment_hash, source_language, target_language, provider))'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_translation_memory_updated_at '
+                'ON translation_memory (updated_at)'
+            )
+
+    @staticmethod
+    def normalize(segment):
+        """
+        Collapse whitespace so layout differences don't split entries
+        """
+        return ' '.join(segment.split())
+
+    @staticmethod
+    def _hash(segment):
+        return hashlib.sha256(segment.encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def lookup(self, segments, source_language, target_language, providers):
+        """
+        Return {segment: translation} for the normalized segments already in
+        memory, preferring entries from providers earlier in `providers`
+        """
+        found = {}
+        if segments and providers:
+            hashes = {self._hash(segment): segment for segment in segments}
+            rank = {provider: i for i, provider in enumerate(providers)}
+            best = {}
+
+            try:
+                with closing(self._connect()) as connection, connection:
+                    hash_list = list(hashes)
+                    # Stay well below SQLite's bound-parameter limit
+                    for start in range(0, len(hash_list), 500):
+                        batch = hash_list[start:start + 500]
+                        rows = connection.execute(
+                            'SELECT segment_hash, provider, translation FROM translation_memory '
+                            'WHERE source_language = ? AND target_language = ? AND updated_at >= ? '
+                            f"AND segment_hash IN ({','.join('?' * len(batch))})",
+                            [source_language, target_language, time.time() - self.ttl, *batch]
+                        ).fetchall()
+
+                        for segment_hash, provider, translation in rows:
+                            if provider not in rank:
+                                continue
+                            if segment_hash not in best or rank[provider] < best[segment_hash][0]:
+                                best[segment_hash] = (rank[provider], provider, translation)
+
+                    connection.executemany(
+                        'UPDATE translation_memory SET hits = hits + 1 WHERE segment_hash = ? '
+                        'AND source_language = ? AND target_language = ? AND provider = ?',
+                        [(segment_hash, source_language, target_language, provider)
+                         for segment_hash, (_, provider, _) in best.items()]
+                    )
+            except sqlite3.Error as e:
+                print(f"Translation memory lookup failed: {e}")
+                best = {}
+
+            for segment_hash, (_, _, translation) in best.items():
+                found[hashes[segment_hash]] = translation
+
+        with self._lock:
+            self.lookups += len(segments)
+            self.hits += len(found)
+            self.chars_looked_up += sum(len(segment) for segment in segments)
+            self.chars_saved += sum(len(segment) for segment in found)
+
+        return found
+
+    def store(self, segments, translations, source_language, target_language, provider):
+        """
+        Remember the provider's translations of normalized segments
+        """
+        now = time.time()
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO translation_memory '
+                    '(segment_hash, source_language, target_language, provider, translation, hits, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, 0, ?)',
+                    [(self._hash(segment), source_language, target_language, provider, translation, now)
+                     for segment, translation in zip(segments, translations)]
+                )
+                connection.execute('DELETE FROM translation_memory WHERE updated_at < ?', (now - self.ttl,))
+                connection.execute(
+                    'DELETE FROM translation_memory WHERE rowid IN ('
+                    'SELECT rowid FROM translation_memory ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"Translation memory write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups, hits = self.lookups, self.hits
+            chars_looked_up, chars_saved = self.chars_looked_up, self.chars_saved
+
+        try:
+            with closing(self._connect()) as connection:
+                entries = connection.execute('SELECT COUNT(*) FROM translation_memory').fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+
+        return {
+            'lookups': lookups,
+            'hits': hits,
+            'hitRatio': hits / lookups if lookups else 0.0,
+            'charactersLookedUp': chars_looked_up,
+            'charactersSaved': chars_saved,
+            'entries': entries
+        }
+
+# Shared translation memory for the application
+translation_memory = TranslationMemory(
+    Config.TRANSLATION_MEMORY_PATH,
+    Config.TRANSLATION_MEMORY_MAX_ENTRIES,
+    Config.TRANSLATION_MEMORY_TTL
+)
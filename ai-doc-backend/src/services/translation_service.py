@@ -1,6 +1,129 @@
-import requests
 import json
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from src.config import Config
+from src.services.http_clients import get_http_client
+from src.services.translation_memory import translation_memory
+from src.services.provider_router import provider_router, ProviderSkipped, ProviderUnavailable
+
+# Characters per request each provider handles reliably
+PROVIDER_CHUNK_LIMITS = {
+    'google': 5000,
+    'azure': 10000,
+    'deepl': 30000
+}
+
+# Texts each provider accepts in a single batch request
+PROVIDER_BATCH_LIMITS = {
+    'google': 128,
+    'azure': 1000,
+    'deepl': 50
+}
+
+# Azure counts every character once per target language against this
+# per-request limit
+AZURE_REQUEST_CHAR_LIMIT = 50000
+
+# Page markers added by OCRService are kept verbatim, never translated
+PAGE_MARKER_PATTERN = re.compile(r'(--- Page \d+ ---)')
+
+# Boundaries tried in order when a piece of text is over the limit:
+# paragraphs, then sentences, then words
+CHUNK_SPLIT_PATTERNS = [
+    r'\n\s*\n',
+    r'(?<=[.!?\u0964\u3002\uff01\uff1f])\s+',
+    r'\s+'
+]
+
+# OCR and pdftotext hard-wrap sentences; a line is taken to continue on the
+# next one unless it ends a sentence, is laid out in columns (a table row:
+# two or more spaces or a tab between words) or the next line opens a list
+# item. Short lines only continue onto a line starting in lowercase, so
+# headings and "name value" rows stay on their own.
+TABLE_LINE_PATTERN = re.compile(r'\S(?:\t| {2,})\S')
+# The whitespace between two columns of a table row
+TABLE_GAP_PATTERN = re.compile(r'([ \t]*(?:\t| {2,})[ \t]*)')
+LIST_ITEM_PATTERN = re.compile(r'\s*(?:[-*\u2022]|\d+[.)])\s')
+LINE_END_PATTERN = re.compile(r'[.!?:;\u0964\u3002\uff01\uff1f]\s*$')
+SOFT_WRAP_MIN_CHARS = 40
+
+# Unicode blocks of the scripts the supported languages are written in
+SCRIPT_RANGES = [
+    ('latin', 0x0041, 0x005A),
+    ('latin', 0x0061, 0x007A),
+    ('latin', 0x00C0, 0x024F),
+    ('cyrillic', 0x0400, 0x04FF),
+    ('arabic', 0x0600, 0x06FF),
+    ('arabic', 0x0750, 0x077F),
+    ('arabic', 0xFB50, 0xFDFF),
+    ('arabic', 0xFE70, 0xFEFF),
+    ('devanagari', 0x0900, 0x097F),
+    ('bengali', 0x0980, 0x09FF),
+    ('gurmukhi', 0x0A00, 0x0A7F),
+    ('gujarati', 0x0A80, 0x0AFF),
+    ('oriya', 0x0B00, 0x0B7F),
+    ('tamil', 0x0B80, 0x0BFF),
+    ('telugu', 0x0C00, 0x0C7F),
+    ('kannada', 0x0C80, 0x0CFF),
+    ('malayalam', 0x0D00, 0x0D7F),
+    ('hangul', 0x1100, 0x11FF),
+    ('hangul', 0x3130, 0x318F),
+    ('hangul', 0xAC00, 0xD7AF),
+    ('kana', 0x3040, 0x30FA),  # U+30FB, the katakana middle dot, is common in Chinese too
+    ('kana', 0x30FC, 0x30FF),
+    ('han', 0x3400, 0x4DBF),
+    ('han', 0x4E00, 0x9FFF)
+]
+
+# Language identified by each non-Latin script on its own
+SCRIPT_LANGUAGES = {
+    'cyrillic': 'ru',
+    'arabic': 'ar',
+    'devanagari': 'hi',
+    'bengali': 'bn',
+    'gurmukhi': 'pa',
+    'gujarati': 'gu',
+    'oriya': 'or',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'hangul': 'ko',
+    'kana': 'ja',
+    'han': 'zh'
+}
+
+# Letters that set a language apart from the others sharing its script
+SCRIPT_VARIANTS = {
+    'devanagari': ('mr', '\u0933'),  # Marathi LLA
+    'bengali': ('as', '\u09f0\u09f1'),  # Assamese RA and WA
+    'arabic': ('ur', '\u0679\u0688\u0691\u06ba\u06c1\u06d2')  # Urdu retroflexes, noon ghunna, heh goal, yeh barree
+}
+
+LOCAL_DETECT_SAMPLE_CHARS = 5000  # characters inspected by the local detector
+LOCAL_DETECT_MIN_SHARE = 0.2  # share of letters a non-Latin script needs to win over Latin
+SCRIPT_VARIANT_MIN_SHARE = 0.002  # share of a script's letters that marks a variant language
+KANA_MIN_SHARE = 0.05  # share of kanji and kana letters that are kana in Japanese text
+
+# str.translate table folding every codepoint of a script into one
+# private-use marker character, so counting markers gives a script
+# histogram in two C-level passes
+_SCRIPT_MARKERS = {
+    name: chr(0xE000 + i)
+    for i, name in enumerate(dict.fromkeys(name for name, _, _ in SCRIPT_RANGES))
+}
+_SCRIPT_TABLE = {codepoint: None for codepoint in range(0xE000, 0xE100)}  # drop real private-use characters
+for _name, _start, _end in SCRIPT_RANGES:
+    _SCRIPT_TABLE.update(dict.fromkeys(range(_start, _end + 1), _SCRIPT_MARKERS[_name]))
+
+# Threads shared by all TranslationService instances for chunk requests
+_translation_pool = ThreadPoolExecutor(
+    max_workers=Config.TRANSLATION_MAX_CONCURRENCY,
+    thread_name_prefix='translate'
+)
 
 class TranslationService:
     def __init__(self):
@@ -8,43 +131,344 @@ class TranslationService:
         self.azure_key = Config.AZURE_TRANSLATOR_KEY
         self.azure_region = Config.AZURE_TRANSLATOR_REGION
         self.deepl_key = Config.DEEPL_API_KEY
+        
+        # Shared keep-alive connection pool for all providers
+        # A read never outlives the router's deadline, so abandoned calls free their thread
+        self.http = get_http_client(
+            'translation', min(Config.TRANSLATION_TIMEOUT, Config.TRANSLATION_CALL_DEADLINE)
+        )
+        
+        # Source languages providers reported while translating, weighted by characters
+        self.detected_languages = Counter()
+        self._detected_lock = threading.Lock()
     
     def translate_text(self, text, target_language, source_language='auto'):
         """
-        Translate text using available translation services
-        Priority: Google Translate -> Azure Translator -> DeepL
+        Translate text using available translation services.
+        Long text is split into chunks on page, paragraph and sentence
+        boundaries, small enough for every configured provider; chunks are
+        translated concurrently and reassembled in order, with the
+        "--- Page N ---" markers left untouched.
+        With TRANSLATION_MEMORY_ENABLED the text is translated line by line
+        through the translation memory instead (see translate_batch).
         """
         if not text or not text.strip():
             return text
         
-        # Try Google Translate first
-        if self.google_api_key:
-            try:
-                return self._translate_with_google(text, target_language, source_language)
-            except Exception as e:
-                print(f"Google Translate failed: {e}")
+        if Config.TRANSLATION_MEMORY_ENABLED:
+            return self.translate_batch([text], [target_language], source_language)[target_language][0]
         
-        # Try Azure Translator
-        if self.azure_key and self.azure_region:
-            try:
-                return self._translate_with_azure(text, target_language, source_language)
-            except Exception as e:
-                print(f"Azure Translator failed: {e}")
+        pieces = self._split_for_translation(text, self._chunk_limit())
+        if len(pieces) == 1 and pieces[0][1]:
+            return self._translate_chunk(text, target_language, source_language)
+        
+        translatable = [chunk for chunk, translate in pieces if translate]
+        translated = iter(_translation_pool.map(
+            lambda chunk: self._translate_chunk(chunk, target_language, source_language),
+            translatable
+        ))
         
-        # Try DeepL
+        return ''.join(next(translated) if translate else chunk for chunk, translate in pieces)
+    
+    def translate_batch(self, texts, target_languages, source_language='auto'):
+        """
+        Translate several texts into several languages at once, returning
+        {language: [translation of each text, in order]}.
+        Texts are split into sentence segments and deduplicated. Segments held
+        in the translation memory are served locally; the rest are packed
+        into the providers' native batch requests (several texts per call,
+        and several target languages per call on Azure) sent concurrently.
+        """
+        limit = self._chunk_limit()
+        pieces_per_text = [
+            self._split_into_segments(text, limit) if text and text.strip() else []
+            for text in texts
+        ]
+        segments = list(dict.fromkeys(
+            translation_memory.normalize(piece)
+            for pieces in pieces_per_text
+            for piece, translate in pieces if translate
+        ))
+        
+        translations = {}
+        missing = {}
+        for language in target_languages:
+            if Config.TRANSLATION_MEMORY_ENABLED:
+                translations[language] = translation_memory.lookup(
+                    segments, source_language, language, self._configured_providers()
+                )
+            else:
+                translations[language] = {}
+            
+            misses = tuple(segment for segment in segments if segment not in translations[language])
+            if misses:
+                missing.setdefault(misses, []).append(language)
+        
+        # Languages missing the same segments share their requests
+        tasks = [
+            (batch, group)
+            for misses, languages in missing.items()
+            for batch in self._pack_batches(misses)
+            for group in self._group_languages(batch, languages)
+        ]
+        results = _translation_pool.map(
+            lambda task: self._translate_batch_with_fallback(task[0], task[1], source_language),
+            tasks
+        )
+        for (batch, languages), (translated, provider) in zip(tasks, results):
+            for language in languages:
+                translations[language].update(zip(batch, translated[language]))
+                # Untranslated fallbacks are never remembered
+                if provider and Config.TRANSLATION_MEMORY_ENABLED:
+                    translation_memory.store(batch, translated[language], source_language, language, provider)
+        
+        return {
+            language: [
+                self._join_segments(pieces, translations[language]) if pieces else text
+                for text, pieces in zip(texts, pieces_per_text)
+            ]
+            for language in target_languages
+        }
+    
+    def _join_segments(self, pieces, translations):
+        """
+        Reassemble segmented text from {normalized segment: translation},
+        keeping each segment's surrounding whitespace
+        """
+        output = []
+        for piece, translate in pieces:
+            if translate:
+                leading = piece[:len(piece) - len(piece.lstrip())]
+                trailing = piece[len(piece.rstrip()):]
+                piece = leading + translations[translation_memory.normalize(piece)] + trailing
+            output.append(piece)
+        return ''.join(output)
+    
+    def _configured_providers(self):
+        """
+        Providers with credentials, in fallback priority order
+        """
+        providers = []
+        if self.google_api_key:
+            providers.append('google')
+        if self.azure_key and self.azure_region:
+            providers.append('azure')
         if self.deepl_key:
-            try:
-                return self._translate_with_deepl(text, target_language, source_language)
-            except Exception as e:
-                print(f"DeepL failed: {e}")
+            providers.append('deepl')
+        return providers
+    
+    def _chunk_limit(self):
+        """
+        Largest chunk every configured provider accepts, so any chunk can
+        fall over to any provider
+        """
+        providers = self._configured_providers() or ['google']
+        return min(PROVIDER_CHUNK_LIMITS[provider] for provider in providers)
+    
+    def _pack_batches(self, segments):
+        """
+        Group segments into batch requests every configured provider accepts,
+        both in number of texts and in total characters
+        """
+        providers = self._configured_providers() or ['google']
+        char_limit = min(PROVIDER_CHUNK_LIMITS[provider] for provider in providers)
+        item_limit = min(PROVIDER_BATCH_LIMITS[provider] for provider in providers)
+        
+        batches = []
+        current, size = [], 0
+        for segment in segments:
+            if current and (len(current) >= item_limit or size + len(segment) > char_limit):
+                batches.append(current)
+                current, size = [], 0
+            current.append(segment)
+            size += len(segment)
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    def _group_languages(self, batch, languages):
+        """
+        Split target languages into groups one batch request can carry.
+        Azure translates into every language of a request at once and
+        bills batch characters times languages against its request limit.
+        """
+        if 'azure' not in self._configured_providers():
+            return [languages]
         
-        # If all services fail, return original text
-        print("All translation services failed, returning original text")
-        return text
+        size = max(sum(len(segment) for segment in batch), 1)
+        group_size = max(AZURE_REQUEST_CHAR_LIMIT // size, 1)
+        return [languages[i:i + group_size] for i in range(0, len(languages), group_size)]
     
-    def _translate_with_google(self, text, target_language, source_language='auto'):
+    def _split_into_segments(self, text, limit):
         """
-        Translate using Google Cloud Translation API
+        Split text into (piece, translate) pairs of sentences. Soft-wrapped
+        lines are joined first so a sentence is never translated in
+        fragments; table rows are split into cells and short lines stay
+        one piece per line.
+        Page markers and whitespace-only pieces are passed through as-is.
+        """
+        pieces = []
+        for part in PAGE_MARKER_PATTERN.split(text):
+            if not part:
+                continue
+            if PAGE_MARKER_PATTERN.fullmatch(part):
+                pieces.append((part, False))
+                continue
+            
+            lines = part.splitlines(keepends=True)
+            block = ''
+            for i, line in enumerate(lines):
+                block += line
+                if i + 1 < len(lines) and self._continues_on_next_line(line, lines[i + 1]):
+                    continue
+                
+                if TABLE_LINE_PATTERN.search(block.strip()):
+                    pieces.extend(self._split_table_row(block, limit))
+                else:
+                    block_pieces = self._split_sentences(block, limit)
+                    pieces.extend((piece, bool(piece.strip())) for piece in block_pieces)
+                block = ''
+        return pieces
+    
+    def _split_table_row(self, row, limit):
+        """
+        Split a table row into (piece, translate) pairs, one per cell, with
+        the column gaps passed through so the layout survives translation
+        """
+        pieces = []
+        for i, part in enumerate(TABLE_GAP_PATTERN.split(row)):
+            if not part:
+                continue
+            if i % 2:
+                pieces.append((part, False))
+            else:
+                pieces.extend((piece, bool(piece.strip())) for piece in self._chunk_text(part, limit, level=2))
+        return pieces
+    
+    def _continues_on_next_line(self, line, next_line):
+        """
+        Whether `line` was hard-wrapped in the middle of a sentence
+        """
+        line, next_line = line.strip(), next_line.rstrip()
+        if not line or not next_line.strip():
+            return False
+        if TABLE_LINE_PATTERN.search(line) or TABLE_LINE_PATTERN.search(next_line.strip()):
+            return False
+        if LINE_END_PATTERN.search(line) or LIST_ITEM_PATTERN.match(next_line):
+            return False
+        return len(line) >= SOFT_WRAP_MIN_CHARS or next_line.lstrip()[0].islower()
+    
+    def _split_sentences(self, text, limit):
+        """
+        Split text into sentences, keeping the separators, with sentences
+        over `limit` cut on word boundaries
+        """
+        parts = re.split(f'({CHUNK_SPLIT_PATTERNS[1]})', text)
+        sentences = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else '') for i in range(0, len(parts), 2)]
+        return [piece for sentence in sentences if sentence for piece in self._chunk_text(sentence, limit, level=2)]
+    
+    def _split_for_translation(self, text, limit):
+        """
+        Split text into (piece, translate) pairs. Page markers and
+        whitespace-only pieces are passed through as-is.
+        """
+        pieces = []
+        for part in PAGE_MARKER_PATTERN.split(text):
+            if not part:
+                continue
+            if PAGE_MARKER_PATTERN.fullmatch(part) or not part.strip():
+                pieces.append((part, False))
+                continue
+            for chunk in self._chunk_text(part, limit):
+                pieces.append((chunk, bool(chunk.strip())))
+        return pieces
+    
+    def _chunk_text(self, text, limit, level=0):
+        """
+        Pack text into chunks of at most `limit` characters, splitting on
+        the coarsest boundary that works and keeping the separators
+        """
+        if len(text) <= limit:
+            return [text]
+        
+        # Nothing left to split on: cut at the limit
+        if level >= len(CHUNK_SPLIT_PATTERNS):
+            return [text[i:i + limit] for i in range(0, len(text), limit)]
+        
+        parts = re.split(f'({CHUNK_SPLIT_PATTERNS[level]})', text)
+        units = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else '') for i in range(0, len(parts), 2)]
+        
+        chunks = []
+        current = ''
+        for unit in units:
+            if len(unit) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.extend(self._chunk_text(unit, limit, level + 1))
+            elif len(current) + len(unit) > limit:
+                chunks.append(current)
+                current = unit
+            else:
+                current += unit
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    def _translate_chunk(self, text, target_language, source_language='auto'):
+        """
+        Translate one chunk, keeping its leading and trailing whitespace
+        (providers tend to strip it, which would glue chunks together)
+        """
+        core = text.strip()
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        
+        return leading + self._translate_with_fallback(core, target_language, source_language) + trailing
+    
+    def _translate_with_fallback(self, text, target_language, source_language='auto'):
+        """
+        Translate text with the first provider that succeeds
+        """
+        translations, _ = self._translate_batch_with_fallback([text], [target_language], source_language)
+        return translations[target_language][0]
+    
+    def _translate_batch_with_fallback(self, texts, target_languages, source_language='auto'):
+        """
+        Translate a list of texts into each target language with the first
+        provider that succeeds, returning ({language: translations}, provider)
+        Priority: Google Translate -> Azure Translator -> DeepL, routed
+        around providers whose circuit is open (see ProviderRouter)
+        """
+        translators = {
+            'google': self._translate_batch_with_google,
+            'azure': self._translate_batch_with_azure,
+            'deepl': self._translate_batch_with_deepl
+        }
+        
+        def checked(translate):
+            translations = translate(texts, target_languages, source_language)
+            for language in target_languages:
+                if len(translations.get(language, [])) != len(texts):
+                    raise ValueError(f"expected {len(texts)} {language} translations")
+            return translations
+        
+        try:
+            return provider_router.call('translate', [
+                (provider, partial(checked, translators[provider]))
+                for provider in self._configured_providers()
+            ])
+        except ProviderUnavailable:
+            # If all services fail, return original text
+            print("All translation services failed, returning original text")
+            return {language: list(texts) for language in target_languages}, None
+    
+    def _translate_batch_with_google(self, texts, target_languages, source_language='auto'):
+        """
+        Translate using Google Cloud Translation API (one q per text, one
+        request per target language)
         """
         url = f"https://translation.googleapis.com/language/translate/v2"
         
@@ -75,28 +499,40 @@ class TranslationService:
             'ar': 'ar'   # Arabic
         }
         
-        target_lang = google_lang_map.get(target_language, target_language)
-        
-        params = {
-            'key': self.google_api_key,
-            'q': text,
-            'target': target_lang,
-            'format': 'text'
-        }
-        
-        if source_language != 'auto':
-            source_lang = google_lang_map.get(source_language, source_language)
-            params['source'] = source_lang
-        
-        response = requests.post(url, data=params)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result['data']['translations'][0]['translatedText']
+        results = {}
+        for target_language in target_languages:
+            target_lang = google_lang_map.get(target_language, target_language)
+            
+            params = {
+                'key': self.google_api_key,
+                'q': texts,
+                'target': target_lang,
+                'format': 'text'
+            }
+            
+            if source_language != 'auto':
+                source_lang = google_lang_map.get(source_language, source_language)
+                params['source'] = source_lang
+            
+            response = self.http.post(url, data=params)
+            response.raise_for_status()
+            
+            result = response.json()
+            results[target_language] = [
+                translation['translatedText'] for translation in result['data']['translations']
+            ]
+            
+            if source_language == 'auto':
+                self._record_detected_languages(texts, [
+                    translation.get('detectedSourceLanguage') for translation in result['data']['translations']
+                ])
+        
+        return results
     
-    def _translate_with_azure(self, text, target_language, source_language='auto'):
+    def _translate_batch_with_azure(self, texts, target_languages, source_language='auto'):
         """
-        Translate using Azure Translator
+        Translate using Azure Translator (one body element per text and
+        every target language in a single request)
         """
         url = "https://api.cognitive.microsofttranslator.com/translate"
         
@@ -127,11 +563,11 @@ class TranslationService:
             'ar': 'ar'   # Arabic
         }
         
-        target_lang = azure_lang_map.get(target_language, target_language)
+        target_langs = [azure_lang_map.get(language, language) for language in target_languages]
         
         params = {
             'api-version': '3.0',
-            'to': target_lang
+            'to': target_langs
         }
         
         if source_language != 'auto':
@@ -144,17 +580,28 @@ class TranslationService:
             'Content-Type': 'application/json'
         }
         
-        body = [{'text': text}]
+        body = [{'text': text} for text in texts]
         
-        response = requests.post(url, params=params, headers=headers, json=body)
+        response = self.http.post(url, params=params, headers=headers, json=body)
         response.raise_for_status()
         
         result = response.json()
-        return result[0]['translations'][0]['text']
+        
+        if source_language == 'auto':
+            self._record_detected_languages(texts, [
+                item.get('detectedLanguage', {}).get('language') for item in result
+            ])
+        
+        # Each item holds one translation per `to` language, in request order
+        return {
+            language: [item['translations'][i]['text'] for item in result]
+            for i, language in enumerate(target_languages)
+        }
     
-    def _translate_with_deepl(self, text, target_language, source_language='auto'):
+    def _translate_batch_with_deepl(self, texts, target_languages, source_language='auto'):
         """
-        Translate using DeepL API
+        Translate using DeepL API (one text parameter per text, one request
+        per target language)
         """
         url = "https://api-free.deepl.com/v2/translate"
         
@@ -174,42 +621,107 @@ class TranslationService:
             'hi': 'HI'  # DeepL supports limited Indian languages
         }
         
-        target_lang = deepl_lang_map.get(target_language)
-        if not target_lang:
-            raise Exception(f"DeepL doesn't support language: {target_language}")
-        
-        data = {
-            'auth_key': self.deepl_key,
-            'text': text,
-            'target_lang': target_lang
-        }
-        
-        if source_language != 'auto' and source_language in deepl_lang_map:
-            data['source_lang'] = deepl_lang_map[source_language]
-        
-        response = requests.post(url, data=data)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result['translations'][0]['text']
+        # Check every language before spending any requests
+        for target_language in target_languages:
+            if target_language not in deepl_lang_map:
+                raise ProviderSkipped(f"DeepL doesn't support language: {target_language}")
+        
+        results = {}
+        for target_language in target_languages:
+            data = {
+                'auth_key': self.deepl_key,
+                'text': texts,
+                'target_lang': deepl_lang_map[target_language]
+            }
+            
+            if source_language != 'auto' and source_language in deepl_lang_map:
+                data['source_lang'] = deepl_lang_map[source_language]
+            
+            response = self.http.post(url, data=data)
+            response.raise_for_status()
+            
+            result = response.json()
+            results[target_language] = [translation['text'] for translation in result['translations']]
+            
+            if source_language == 'auto':
+                self._record_detected_languages(texts, [
+                    translation.get('detected_source_language') for translation in result['translations']
+                ])
+        
+        return results
+    
+    def _record_detected_languages(self, texts, languages):
+        """
+        Tally source languages reported in a translate response
+        """
+        with self._detected_lock:
+            for text, language in zip(texts, languages):
+                if language:
+                    # e.g. 'zh-Hans' from Azure, 'EN' from DeepL
+                    self.detected_languages[language.split('-')[0].lower()] += len(text)
+    
+    def get_detected_source_language(self):
+        """
+        Source language the providers reported for most of the text this
+        service translated, or None if none was reported (e.g. every
+        segment came from the translation memory)
+        """
+        with self._detected_lock:
+            most_common = self.detected_languages.most_common(1)
+        return most_common[0][0] if most_common else None
+    
+    def detect_language_locally(self, text):
+        """
+        Detect the language from the Unicode scripts of its letters, without
+        a network call. Returns None when the text is mostly Latin (or has
+        no letters), where the script alone can't tell languages apart.
+        """
+        sample = text[:LOCAL_DETECT_SAMPLE_CHARS]
+        histogram = Counter(sample.translate(_SCRIPT_TABLE))
+        scripts = {name: histogram[marker] for name, marker in _SCRIPT_MARKERS.items()}
+        
+        letters = sum(scripts.values())
+        script, count = max(
+            ((name, count) for name, count in scripts.items() if name != 'latin'),
+            key=lambda item: item[1]
+        )
+        if not count or count / letters < LOCAL_DETECT_MIN_SHARE:
+            return None
+        
+        # Japanese mixes kanji with kana; Chinese only borrows the odd kana
+        if script in ('han', 'kana') and scripts['kana'] / (scripts['han'] + scripts['kana']) >= KANA_MIN_SHARE:
+            return 'ja'
+        
+        if script in SCRIPT_VARIANTS:
+            language, letters_of_variant = SCRIPT_VARIANTS[script]
+            variant_count = sum(sample.count(letter) for letter in letters_of_variant)
+            if variant_count / count >= SCRIPT_VARIANT_MIN_SHARE:
+                return language
+        
+        return SCRIPT_LANGUAGES[script]
     
     def detect_language(self, text):
         """
-        Detect the language of the given text
+        Detect the language of the given text, locally from its script when
+        possible and otherwise with the providers
         """
-        if self.google_api_key:
-            try:
-                return self._detect_language_google(text)
-            except Exception as e:
-                print(f"Google language detection failed: {e}")
+        language = self.detect_language_locally(text)
+        if language:
+            return language
         
-        if self.azure_key and self.azure_region:
-            try:
-                return self._detect_language_azure(text)
-            except Exception as e:
-                print(f"Azure language detection failed: {e}")
+        detectors = {
+            'google': self._detect_language_google,
+            'azure': self._detect_language_azure
+        }
         
-        return 'en'  # Default to English
+        try:
+            language, _ = provider_router.call('detect', [
+                (provider, partial(detectors[provider], text))
+                for provider in self._configured_providers() if provider in detectors
+            ])
+            return language
+        except ProviderUnavailable:
+            return 'en'  # Default to English
     
     def _detect_language_google(self, text):
         """
@@ -222,7 +734,7 @@ class TranslationService:
             'q': text
         }
         
-        response = requests.post(url, data=params)
+        response = self.http.post(url, data=params)
         response.raise_for_status()
         
         result = response.json()
@@ -246,7 +758,7 @@ class TranslationService:
         
         body = [{'text': text}]
         
-        response = requests.post(url, params=params, headers=headers, json=body)
+        response = self.http.post(url, params=params, headers=headers, json=body)
         response.raise_for_status()
         
         result = response.json()
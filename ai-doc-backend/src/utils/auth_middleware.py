@@ -1,9 +1,45 @@
 from functools import wraps
 from flask import request, jsonify
 import jwt
-from src.models.user import User
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from src.models.user import db, User
+from src.services.auth_cache import user_cache, token_cache
 from src.config import Config
 
+def _verify_token(token):
+    """
+    User id of a valid token. Verified tokens are remembered until they
+    expire, so repeated requests skip the signature check.
+    """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    user_id = payload['user_id']
+    if 'exp' in payload:
+        token_cache.set(token, user_id, expires_at=payload['exp'])
+    return user_id
+
+def _load_user(user_id):
+    """
+    The user attached to this request's session, built from the cached
+    column values when available so the database isn't queried
+    """
+    columns = user_cache.get(user_id)
+    if columns is None:
+        user = User.query.get(user_id)
+        if user:
+            user_cache.set(user_id, {
+                attribute.key: getattr(user, attribute.key) for attribute in inspect(User).column_attrs
+            })
+        return user
+
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -18,11 +54,10 @@ def token_required(f):
                 token = token[7:]
             
             # Decode token
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-            user_id = payload['user_id']
+            user_id = _verify_token(token)
             
             # Find user
-            current_user = User.query.get(user_id)
+            current_user = _load_user(user_id)
             if not current_user:
                 return jsonify({'error': 'User not found'}), 401
             
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_
+from src.config import Config
+
+def get_page_args():
+    """
+    (limit, cursor) from the query string, or (None, None) when the client
+    didn't ask for a page
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        return None, None
+
+    limit = min(max(limit or Config.PAGE_DEFAULT_LIMIT, 1), Config.PAGE_MAX_LIMIT)
+    return limit, cursor
+
+def encode_cursor(timestamp, row_id):
+    """
+    Opaque cursor for the position just after a row
+    """
+    raw_cursor = json.dumps([timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw_cursor.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    (timestamp, id) of a cursor; raises ValueError if it is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_query(query, timestamp_column, id_column, limit, cursor=None):
+    """
+    `query` narrowed to the rows after `cursor`, newest first on
+    (timestamp, id), with one extra row to tell whether another page
+    follows. The filter is a range on the timestamp so the composite
+    (owner, timestamp) index serves every page at the same cost, however deep.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(
+            timestamp_column <= timestamp,
+            or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < row_id))
+        )
+
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+def keyset_page(query, timestamp_column, id_column, limit, cursor=None):
+    """
+    One page of `query` (see keyset_query). Returns (rows, next_cursor),
+    next_cursor being None on the last page.
+    """
+    rows = keyset_query(query, timestamp_column, id_column, limit, cursor).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
@@ -0,0 +1,14 @@
+import json
+
+def sse_event(event, data):
+    """
+    Format one Server-Sent Events message
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Response headers for event streams; X-Accel-Buffering stops proxies
+# (e.g. nginx) from buffering the stream
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
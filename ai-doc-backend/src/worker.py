@@ -0,0 +1,19 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Standalone job worker. Run one or more of these next to the web server
+# (optionally with JOB_QUEUE_ENABLED=false on the web processes) to process
+# queued reports in separate processes; they share the queue via the database.
+from src.main import app
+from src.migrations import run_migrations
+from src.services.job_queue import job_queue
+
+if __name__ == '__main__':
+    with app.app_context():
+        run_migrations()
+
+    job_queue.start(app)
+    print("Job worker started, waiting for jobs...")
+    job_queue.join()